@@ -2,13 +2,26 @@ from flask import Flask
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
-import logging
 import os
+import time
+
+def _timed_init(app, name, init):
+    """Run init(app), recording its duration in app.extensions['startup_ms']"""
+    start = time.perf_counter()
+    result = init(app)
+    app.extensions['startup_ms'][name] = round((time.perf_counter() - start) * 1000, 3)
+    return result
 
 def create_app(config_class=Config):
     """Application factory function"""
+    started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # Per-phase startup durations, reported by /health and profile_startup.py
+    app.extensions['startup_ms'] = {}
+    
+    from .json_provider import init_json_provider
+    init_json_provider(app)
     
     # Set secret key for sessions
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
@@ -21,7 +34,7 @@ def create_app(config_class=Config):
     app.config['SESSION_COOKIE_NAME'] = 'supercar_session'
     
     # Middleware
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_TRUSTED_HOPS'], x_proto=1, x_host=1, x_port=1)
     
     # Configure CORS to support credentials and cross-origin requests
     CORS(app, 
@@ -31,22 +44,21 @@ def create_app(config_class=Config):
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
     
     # Set up logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('app.log')
-        ]
-    )
+    from .logs import configure_logging
+    configure_logging(app)
     
     # Initialize extensions
-    from .database import init_db
+    from .database import init_db, close_request_sessions
     from .ml import init_ml
+    from .write_behind import init_write_behind
+    from .hashing import init_password_hashing
     
     # Initialize database and ML model
-    init_db(app)
-    init_ml(app)
+    _timed_init(app, 'database', init_db)
+    app.teardown_appcontext(close_request_sessions)
+    _timed_init(app, 'model', init_ml)
+    _timed_init(app, 'write_behind', init_write_behind)
+    _timed_init(app, 'password_hashing', init_password_hashing)
     
     # Register blueprints
     from .routes.health import health_bp
@@ -55,6 +67,8 @@ def create_app(config_class=Config):
     from .routes.stats import stats_bp
     from .routes.db_admin import db_admin_bp
     from .routes.auth import auth_bp
+    from .routes.metrics import metrics_bp
+    from .routes.model_admin import model_admin_bp
     from app.routes.main import main_bp
     
     app.register_blueprint(health_bp)
@@ -63,6 +77,8 @@ def create_app(config_class=Config):
     app.register_blueprint(stats_bp)
     app.register_blueprint(db_admin_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(model_admin_bp)
     app.register_blueprint(main_bp)
     
     # Register error handlers
@@ -71,6 +87,10 @@ def create_app(config_class=Config):
     # Register middleware
     register_middleware(app)
     
+    startup = app.extensions['startup_ms']
+    startup['total'] = round((time.perf_counter() - started) * 1000, 3)
+    app.logger.info(f"Application created in {startup['total']:.1f} ms "
+                    f"(database {startup['database']:.1f} ms, model {startup['model']:.1f} ms)")
     return app
 
 def register_error_handlers(app):
@@ -108,31 +128,122 @@ def register_error_handlers(app):
 
 def register_middleware(app):
     """Register middleware for the application"""
-    from flask import g, request
+    from flask import g, request, session, jsonify
     from datetime import datetime
+    import time
     import uuid
+    from . import metrics, profiling, ratelimit
+    from .logs import LogSampler
+    from .compression import compress_response
+    from .utils import get_client_ip
+    
+    ratelimit.init_rate_limiter(app)
+    quiet_endpoints = {'health.health_check', 'health.liveness_check', 'health.readiness_check', 'metrics.get_metrics'}
+    log_sampler = LogSampler(app.config['LOG_SUCCESS_SAMPLE_RATE'], app.config['LOG_SAMPLE_TARGET_PER_SECOND'])
+    
+    @app.before_request
+    def track_request_start():
+        """Count the request as in flight for /metrics"""
+        g.metrics_start = time.perf_counter()
+        metrics.requests_in_flight.inc()
     
     @app.before_request
     def before_request():
         """Process before each request"""
         g.start_time = datetime.now()
         g.request_id = request.headers.get('X-Request-ID', str(uuid.uuid4()))
+        # Sampled-out requests only log their completion if it failed
+        g.log_sampled = log_sampler.sample()
+        
+        if request.endpoint not in quiet_endpoints and g.log_sampled:
+            app.logger.info(
+                "Incoming request %s %s - ID: %s", request.method, request.path, g.request_id,
+                extra={'request_id': g.request_id, 'endpoint': request.endpoint,
+                       'method': request.method, 'path': request.path}
+            )
+
+    @app.before_request
+    def start_request_profiler():
+        """Profile this request with cProfile when X-Profile: 1 is allowed"""
+        if profiling.profiling_requested(app, request.headers):
+            g.profiler = profiling.start_profiler()
+
+    @app.before_request
+    def enforce_rate_limit():
+        """Reject requests over the endpoint's limit with 429"""
+        if ratelimit.limiter is None:
+            return None
+        
+        user_id = session.get('user_id')
+        identity = f"user:{user_id}" if user_id else f"ip:{get_client_ip()}"
+        result = ratelimit.limiter.check(request.endpoint, identity)
+        if result is None:
+            return None
         
-        if request.endpoint != 'health.health_check':
-            app.logger.info(f"Incoming request {request.method} {request.path} - ID: {g.request_id}")
+        g.rate_limit = result
+        if not result.allowed:
+            app.logger.warning(f"Rate limit exceeded for {identity} on {request.endpoint} - ID: {g.request_id}")
+            response = jsonify({
+                'error': 'Too many requests',
+                'message': f'Rate limit of {result.limit} requests exceeded. Please try again later.',
+                'error_code': 'RATE_LIMITED',
+                'request_id': g.request_id
+            })
+            response.status_code = 429
+            return response
+        return None
 
     @app.after_request
     def after_request(response):
         """Process after each request"""
-        if request.endpoint != 'health.health_check':
+        g.response_status = response.status_code
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            try:
+                path = profiling.stop_profiler(profiler, app.config['PROFILE_DIR'], g.request_id)
+                response.headers['X-Profile-File'] = os.path.basename(path)
+                app.logger.info(f"Wrote request profile {path} - ID: {g.request_id}")
+            except OSError as e:
+                app.logger.error(f"Failed to write request profile: {str(e)}")
+        
+        response.headers['Server-Timing'] = profiling.server_timing_header(
+            g.get('server_timing', []), time.perf_counter() - g.metrics_start)
+        if request.endpoint not in quiet_endpoints:
             duration = (datetime.now() - g.start_time).total_seconds() * 1000
-            app.logger.info(
-                f"Completed {request.method} {request.path} - "
-                f"Status: {response.status_code} - "
-                f"Duration: {duration:.2f}ms - "
-                f"ID: {g.request_id}"
-            )
+            if g.get('log_sampled', True) or response.status_code >= 400:
+                app.logger.info(
+                    "Completed %s %s - Status: %s - Duration: %.2fms - ID: %s",
+                    request.method, request.path, response.status_code, duration, g.request_id,
+                    extra={'request_id': g.request_id, 'endpoint': request.endpoint,
+                           'method': request.method, 'path': request.path,
+                           'status': response.status_code, 'duration_ms': round(duration, 2)}
+                )
             response.headers['X-Request-ID'] = g.request_id
             response.headers['X-Request-Duration'] = f"{duration:.2f}ms"
         
-        return response
\ No newline at end of file
+        if g.get('rate_limit') is not None:
+            response.headers.update(ratelimit.rate_limit_headers(g.rate_limit))
+        
+        if app.config['COMPRESSION_ENABLED']:
+            compress_response(response, request.accept_encodings,
+                              app.config['COMPRESS_MIN_SIZE'], app.config['COMPRESS_LEVEL'])
+        
+        return response
+
+    @app.teardown_request
+    def track_request_end(error=None):
+        """Record the request latency histogram, including failed requests"""
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+        
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        metrics.requests_in_flight.dec()
+        metrics.request_latency.observe(
+            time.perf_counter() - start,
+            request.endpoint or 'unmatched',
+            request.method,
+            str(g.get('response_status', 500))
+        )
\ No newline at end of file
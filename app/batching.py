@@ -0,0 +1,170 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+class BatcherStopped(RuntimeError):
+    """Raised for records submitted to, or left queued in, a stopped micro-batcher"""
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into vectorized model calls
+
+    Callers submit one record and block on a future. A background thread
+    collects everything that arrives within ``max_latency`` seconds of the
+    first queued record (or until ``max_batch_size`` rows are waiting), runs
+    ``predict_fn`` once on the whole batch and hands each caller its own price.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_latency=0.002, result_timeout=30.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_latency = max(0.0, max_latency)
+        self.result_timeout = result_timeout
+        self._queue = queue.Queue()
+        # Guards _accepting and every put, so nothing is queued behind _STOP
+        self._lock = threading.Lock()
+        self._accepting = False
+        self._thread = None
+
+        # Batch fill metrics; the histogram is indexed by batch size
+        self.batches = 0
+        self.rows = 0
+        self.full_batches = 0
+        self.failed_batches = 0
+        self.batch_size_histogram = [0] * (self.max_batch_size + 1)
+
+    def start(self):
+        """Start the background batching thread"""
+        with self._lock:
+            if not self._accepting:
+                # A fresh queue, so a previous thread still finishing its last batch can't take from it
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name='micro-batcher', daemon=True)
+                self._accepting = True
+                self._thread.start()
+        return self
+
+    def shutdown(self, timeout=5.0):
+        """Stop accepting work once the queued records have been scored"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            if self._accepting:
+                self._accepting = False
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._accepting
+
+    def submit(self, record):
+        """Queue a record and return a Future resolving to its predicted price"""
+        future = Future()
+        with self._lock:
+            if not self._accepting:
+                raise BatcherStopped("Micro-batcher is not running")
+            self._queue.put((record, future))
+        return future
+
+    def predict(self, record):
+        """Submit a record and wait for its price"""
+        return self.submit(record).result(timeout=self.result_timeout)
+
+    def stats(self):
+        """Return batch fill metrics"""
+        batches = self.batches
+        average = self.rows / batches if batches else 0.0
+        return {
+            'enabled': self.running,
+            'max_batch_size': self.max_batch_size,
+            'max_latency_ms': round(self.max_latency * 1000, 3),
+            'queue_depth': self._queue.qsize(),
+            'batches': batches,
+            'rows': self.rows,
+            'average_batch_size': round(average, 3),
+            'average_fill_ratio': round(average / self.max_batch_size, 4),
+            'full_batches': self.full_batches,
+            'failed_batches': self.failed_batches,
+            'batch_size_histogram': {
+                str(size): count for size, count in enumerate(self.batch_size_histogram) if count
+            }
+        }
+
+    def _run(self, work):
+        try:
+            self._collect_batches(work)
+        finally:
+            with self._lock:
+                if work is self._queue:
+                    self._accepting = False
+            self._fail_pending(work)
+
+    def _collect_batches(self, work):
+        while True:
+            item = work.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = work.get(timeout=remaining) if remaining > 0 else work.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+            if stopping:
+                return
+
+    def _fail_pending(self, work):
+        """Fail records still queued once the thread stops; none can be added after _accepting is cleared"""
+        while True:
+            try:
+                item = work.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(BatcherStopped("Micro-batcher stopped before scoring this record"))
+
+    def _process(self, batch):
+        batch = [(record, future) for record, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        size = len(batch)
+        self.batches += 1
+        self.rows += size
+        self.batch_size_histogram[size] += 1
+        if size == self.max_batch_size:
+            self.full_batches += 1
+
+        try:
+            prices = self.predict_fn([record for record, _ in batch])
+        except Exception as e:
+            self.failed_batches += 1
+            if size == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Score rows individually so one bad record doesn't fail its neighbours
+            logging.warning(f"Micro-batch of {size} failed, retrying rows individually: {str(e)}")
+            for record, future in batch:
+                try:
+                    future.set_result(self.predict_fn([record])[0])
+                except Exception as row_error:
+                    future.set_exception(row_error)
+            return
+
+        for (_, future), price in zip(batch, prices):
+            future.set_result(price)
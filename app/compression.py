@@ -0,0 +1,40 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/html',
+                          'text/css', 'text/plain', 'application/javascript', 'text/javascript'}
+
+def available_encodings():
+    """Content codings we can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def compress_body(data, encoding, level):
+    if encoding == 'br':
+        # Brotli quality runs 0-11; map the shared 1-9 level onto it
+        return brotli.compress(data, quality=min(11, level + 2))
+    return gzip.compress(data, compresslevel=level)
+
+def compress_response(response, accept_encodings, min_size, level):
+    """Compress a buffered response body in place when the client accepts br or gzip"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    encoding = accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress_body(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    return response
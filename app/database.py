@@ -1,33 +1,215 @@
-from sqlalchemy import create_engine, text
+import itertools
+import logging
+import os
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
+from .metrics import InstrumentedQueuePool
 from .models import Base
+from .rollups import ensure_rollups
 
 engine = None
 SessionLocal = None
+ReadSessionLocal = None
 
-def init_db(app):
-    """Initialize database connection"""
-    global engine, SessionLocal
+class PoolTracker:
+    """Pool checkout/checkin listener recording who holds each connection"""
+
+    def __init__(self, leak_threshold=30.0):
+        self.leak_threshold = leak_threshold
+        self.checkouts = 0
+        self.checkins = 0
+        self._held = {}
+        self._lock = threading.Lock()
+
+    def attach(self, tracked_engine):
+        with self._lock:
+            self._held.clear()
+        event.listen(tracked_engine, 'checkout', self._on_checkout)
+        event.listen(tracked_engine, 'checkin', self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        if has_request_context():
+            owner = f"{request.method} {request.path} ({g.get('request_id', 'unknown')})"
+        else:
+            owner = threading.current_thread().name
+        with self._lock:
+            self.checkouts += 1
+            self._held[id(connection_record)] = (time.monotonic(), owner)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self._held.pop(id(connection_record), None)
+
+    def leaked(self):
+        """Connections checked out for longer than leak_threshold seconds"""
+        now = time.monotonic()
+        with self._lock:
+            held = list(self._held.values())
+        return sorted(
+            ({'held_seconds': round(now - since, 3), 'owner': owner}
+             for since, owner in held if now - since > self.leak_threshold),
+            key=lambda item: item['held_seconds'], reverse=True
+        )
+
+    def stats(self):
+        with self._lock:
+            held = len(self._held)
+        return {
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'held_connections': held,
+            'leak_threshold_seconds': self.leak_threshold,
+            'leaked': self.leaked()
+        }
+
+pool_tracker = PoolTracker()
+
+class Replica:
+    """A read replica engine and its last known health"""
+
+    def __init__(self, url, replica_engine):
+        self.url = url
+        self.engine = replica_engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+        self.healthy = True
+        self.lag_seconds = None
+        self.checked_at = 0.0
+        self.last_error = None
+        self._check_lock = threading.Lock()
+        event.listen(replica_engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        # A dropped connection takes the replica out of rotation until the next check
+        if context.is_disconnect:
+            self.healthy = False
+            self.last_error = str(context.original_exception)
+
+    def check(self, max_lag):
+        """Ping the replica and, on PostgreSQL, measure its replay lag"""
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == 'postgresql':
+                    lag = conn.execute(text(
+                        "SELECT CASE WHEN pg_is_in_recovery() "
+                        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                        "ELSE 0 END"
+                    )).scalar()
+                    self.lag_seconds = float(lag)
+                else:
+                    conn.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            self.healthy = self.lag_seconds <= max_lag
+            self.last_error = None if self.healthy else f"Replication lag {self.lag_seconds:.1f}s"
+        except Exception as e:
+            self.healthy = False
+            self.last_error = str(e)
+        self.checked_at = time.monotonic()
+
+    def is_healthy(self, check_interval, max_lag):
+        """Cached health, re-checked by one caller at a time once it is stale"""
+        if time.monotonic() - self.checked_at > check_interval and self._check_lock.acquire(blocking=False):
+            try:
+                self.check(max_lag)
+            finally:
+                self._check_lock.release()
+        return self.healthy
+
+    def stats(self):
+        return {
+            'url': self.url.split('@')[-1],
+            'healthy': self.healthy,
+            'lag_seconds': self.lag_seconds,
+            'last_error': self.last_error
+        }
+
+class ReadSessionRouter:
+    """Session factory for read-only endpoints
+
+    Hands out sessions bound to the next healthy replica in round-robin order,
+    or to the primary when no replica is configured or healthy.
+    """
+
+    def __init__(self, primary_factory, replicas=(), check_interval=5.0, max_lag=30.0):
+        self.primary_factory = primary_factory
+        self.replicas = list(replicas)
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._next = itertools.count()
+        self.replica_sessions = 0
+        self.primary_fallbacks = 0
+
+    def pick_replica(self):
+        count = len(self.replicas)
+        start = next(self._next)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.is_healthy(self.check_interval, self.max_lag):
+                return replica
+        return None
+
+    def __call__(self, use_primary=False):
+        replica = None if use_primary or not self.replicas else self.pick_replica()
+        if replica is None:
+            if self.replicas and not use_primary:
+                self.primary_fallbacks += 1
+            return self.primary_factory()
+        self.replica_sessions += 1
+        return replica.session_factory()
+
+    def dispose(self, close=True):
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+
+    def stats(self):
+        return {
+            'replicas': [replica.stats() for replica in self.replicas],
+            'replica_sessions': self.replica_sessions,
+            'primary_fallbacks': self.primary_fallbacks
+        }
+
+def create_read_router(app, replica_urls, pool_size, max_overflow):
+    """Build replica engines for the read-only session router"""
+    replicas = [Replica(url, create_db_engine(url, pool_size, max_overflow)) for url in replica_urls]
+    return ReadSessionRouter(
+        SessionLocal,
+        replicas,
+        check_interval=app.config['REPLICA_HEALTH_CHECK_INTERVAL'],
+        max_lag=app.config['REPLICA_MAX_LAG_SECONDS']
+    )
+
+def _pin_reads_after_commit(db_session):
+    """Send the committing client's reads to the primary for READ_YOUR_WRITES_SECONDS"""
+    if has_request_context():
+        from .utils import mark_recent_write
+        mark_recent_write()
+
+def init_db(app, replica_urls=None):
+    """Initialize database connection, plus read replicas (defaults to DATABASE_REPLICA_URLS)"""
+    global engine, SessionLocal, ReadSessionLocal
     
     try:
         db_url = app.config['DATABASE_URL']
         app.logger.info(f"Attempting to connect to database at: {db_url.split('@')[-1]}")
-        engine = create_engine(
-            app.config['DATABASE_URL'],
-            pool_size=10,
-            max_overflow=20,
-            pool_pre_ping=True,
-            pool_recycle=3600
-        )
+        engine = create_db_engine(app.config['DATABASE_URL'], app.config['DB_POOL_SIZE'], app.config['DB_MAX_OVERFLOW'])
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        event.listen(SessionLocal, 'after_commit', _pin_reads_after_commit)
+        pool_tracker.leak_threshold = app.config['DB_LEAK_THRESHOLD_SECONDS']
+        pool_tracker.attach(engine)
         
-        # Test connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        if replica_urls is None:
+            replica_urls = app.config['DATABASE_REPLICA_URLS']
+        ReadSessionLocal = create_read_router(app, replica_urls, app.config['DB_POOL_SIZE'], app.config['DB_MAX_OVERFLOW'])
+        if replica_urls:
+            app.logger.info(f"Routing read-only endpoints across {len(replica_urls)} replica(s)")
         
-        # Create tables if they don't exist
-        Base.metadata.create_all(bind=engine)
+        # Connections are opened on first use; /health/ready checks reachability.
+        # Schema changes belong to init_db.py and migrations, not worker startup
+        if app.config['DB_CREATE_SCHEMA']:
+            create_schema(engine, app.logger)
         
         app.logger.info("Database setup completed successfully!")
         return True
@@ -36,16 +218,93 @@ def init_db(app):
         app.logger.error(f"Database setup failed: {str(e)}")
         return False
 
-def get_db_session():
-    """Get a database session with context management"""
-    if SessionLocal is None:
-        return None
+def create_schema(bind_engine=None, logger=logging):
+    """Create missing tables and backfill the stats rollups for existing predictions"""
+    bind_engine = bind_engine or engine
+    Base.metadata.create_all(bind=bind_engine)
     
-    session = SessionLocal()
+    session = sessionmaker(bind=bind_engine)()
     try:
-        yield session
-    except SQLAlchemyError as e:
-        session.rollback()
-        raise
+        if ensure_rollups(session):
+            session.commit()
+            logger.info("Rebuilt prediction rollups from existing predictions")
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+def check_connection():
+    """Run SELECT 1 on the primary; raises if the database is unreachable"""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+def create_db_engine(db_url, pool_size, max_overflow):
+    """Create an engine with the application's pool settings"""
+    return create_engine(
+        db_url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=3600
+    )
+
+def reinit_db_after_fork(app, pool_size, max_overflow):
+    """Give a forked worker process its own engine and connection pool"""
+    global engine
+    
+    if SessionLocal is None:
+        return False
+    
+    # Connections inherited from the parent must never be used by the child
+    if engine is not None:
+        engine.dispose(close=False)
+    
+    engine = create_db_engine(app.config['DATABASE_URL'], pool_size, max_overflow)
+    SessionLocal.configure(bind=engine)
+    pool_tracker.attach(engine)
+    
+    if ReadSessionLocal is not None and ReadSessionLocal.replicas:
+        ReadSessionLocal.dispose(close=False)
+        ReadSessionLocal.replicas = [
+            Replica(replica.url, create_db_engine(replica.url, pool_size, max_overflow))
+            for replica in ReadSessionLocal.replicas
+        ]
+    app.logger.info(f"Worker {os.getpid()} database pool initialized (size={pool_size}, overflow={max_overflow})")
+    return True
+
+def get_request_session():
+    """Primary-database session for the current request, opened on first use
+    and closed by close_request_sessions when the request ends"""
+    db_session = g.get('db_session')
+    if db_session is None:
+        db_session = g.db_session = SessionLocal()
+    return db_session
+
+def get_request_read_session(use_primary=False):
+    """Read-only session for the current request; reuses an open primary session"""
+    db_session = g.get('db_session') or g.get('db_read_session')
+    if db_session is None:
+        db_session = g.db_read_session = ReadSessionLocal(use_primary=use_primary)
+    return db_session
+
+def close_request_sessions(exception=None):
+    """Teardown hook returning the request's connections to the pool"""
+    for key in ('db_session', 'db_read_session'):
+        db_session = g.pop(key, None)
+        if db_session is not None:
+            db_session.close()
+
+def pool_stats():
+    """Pool occupancy, checkout waits and connections held past the leak threshold"""
+    from .metrics import POOL_WAIT
+    counts, wait_total = POOL_WAIT.snapshot()
+    waits = sum(counts)
+    pool = engine.pool if engine is not None else None
+    return dict(
+        pool_tracker.stats(),
+        pool_size=pool.size() if hasattr(pool, 'size') else None,
+        checked_out=pool.checkedout() if hasattr(pool, 'checkedout') else None,
+        overflow=max(pool.overflow(), 0) if hasattr(pool, 'overflow') else None,
+        checkout_waits=waits,
+        total_wait_seconds=round(wait_total, 6),
+        average_wait_ms=round(wait_total / waits * 1000, 3) if waits else 0.0
+    )
@@ -0,0 +1,230 @@
+import math
+import numpy as np
+
+class EncoderCompileError(ValueError):
+    """Raised when the pipeline uses steps the compiled encoder cannot reproduce"""
+
+def coerce_number(value):
+    """Coerce a raw value the way pd.to_numeric(errors='coerce').fillna(0) does"""
+    if isinstance(value, str) and '_' in value:
+        return 0.0
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(number) else number
+
+def coerce_int(value):
+    """Coerce a raw value to an integer feature, truncating like astype('int64')"""
+    number = coerce_number(value)
+    if math.isinf(number):
+        raise ValueError("Cannot convert non-finite values (NA or inf) to integer")
+    return float(math.trunc(number))
+
+# sklearn is imported where the pipeline is compiled rather than at module
+# import: coerce_number/coerce_int sit on the request path and importing
+# sklearn costs most of the app's startup time
+
+def _split_steps(transformer):
+    """Return the list of fitted estimators making up one ColumnTransformer entry"""
+    from sklearn.pipeline import Pipeline
+    if isinstance(transformer, Pipeline):
+        return [step for _, step in transformer.steps if step != 'passthrough']
+    return [transformer]
+
+class _NumericBlock:
+    """Imputer and scaler parameters for a group of numeric columns"""
+
+    def __init__(self, columns, steps, offset):
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import StandardScaler
+        self.columns = columns
+        self.offset = offset
+        self.width = len(columns)
+        self.fill = None
+        self.mean = None
+        self.scale = None
+
+        for step in steps:
+            if isinstance(step, SimpleImputer) and self.mean is None and self.scale is None:
+                if step.add_indicator or not _is_nan_marker(step.missing_values):
+                    raise EncoderCompileError("Unsupported SimpleImputer configuration")
+                self.fill = np.asarray(step.statistics_, dtype='float64')
+            elif isinstance(step, StandardScaler):
+                if step.mean_ is not None:
+                    self.mean = np.asarray(step.mean_, dtype='float64')
+                if step.scale_ is not None:
+                    self.scale = np.asarray(step.scale_, dtype='float64')
+            else:
+                raise EncoderCompileError(f"Unsupported numeric step: {type(step).__name__}")
+
+class _CategoricalBlock:
+    """Category-to-column index maps for a group of one-hot encoded columns"""
+
+    def __init__(self, columns, steps, offset):
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import OneHotEncoder
+        self.columns = columns
+        self.offset = offset
+        self.fill_value = None
+
+        *imputers, onehot = steps
+        if not isinstance(onehot, OneHotEncoder):
+            raise EncoderCompileError("Categorical block must end with a OneHotEncoder")
+        for step in imputers:
+            if not isinstance(step, SimpleImputer) or step.strategy != 'constant' or step.add_indicator:
+                raise EncoderCompileError(f"Unsupported categorical step: {type(step).__name__}")
+            self.fill_value = step.fill_value
+        if onehot.drop_idx_ is not None or getattr(onehot, '_infrequent_enabled', False):
+            raise EncoderCompileError("OneHotEncoder drop/infrequent categories are not supported")
+
+        self.handle_unknown = onehot.handle_unknown
+        self.index_maps = []
+        self.column_offsets = []
+        width = 0
+        for categories in onehot.categories_:
+            self.index_maps.append({category: i for i, category in enumerate(categories.tolist())})
+            self.column_offsets.append(offset + width)
+            width += len(categories)
+        self.width = width
+
+def _is_nan_marker(value):
+    return isinstance(value, float) and math.isnan(value)
+
+class CompiledEncoder:
+    """NumPy re-implementation of a fitted ColumnTransformer for dict records
+
+    Turns request dicts straight into the estimator's input matrix using the
+    fitted imputer statistics, scaler means/scales and one-hot category maps,
+    skipping pandas DataFrame construction entirely.
+    """
+
+    def __init__(self, pipeline, defaults, int_columns, float_columns):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder
+        if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+            raise EncoderCompileError("Expected a (preprocessor, model) pipeline")
+
+        preprocessor = pipeline.steps[0][1]
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise EncoderCompileError("Expected a ColumnTransformer preprocessor")
+
+        self.estimator = pipeline.steps[-1][1]
+        self.defaults = defaults
+        self.int_columns = set(int_columns)
+        self.float_columns = set(float_columns)
+        self.numeric_blocks = []
+        self.categorical_blocks = []
+
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            columns = list(columns) if not isinstance(columns, str) else [columns]
+            if transformer == 'drop' or not columns:
+                continue
+            if transformer == 'passthrough' or not all(isinstance(col, str) for col in columns):
+                raise EncoderCompileError(f"Unsupported transformer '{name}'")
+
+            steps = _split_steps(transformer)
+            if steps and isinstance(steps[-1], OneHotEncoder):
+                block = _CategoricalBlock(columns, steps, offset)
+                self.categorical_blocks.append(block)
+            else:
+                for col in columns:
+                    if col not in self.int_columns and col not in self.float_columns:
+                        raise EncoderCompileError(f"Column '{col}' is not a known numeric feature")
+                block = _NumericBlock(columns, steps, offset)
+                self.numeric_blocks.append(block)
+            offset += block.width
+
+        self.n_features_out = offset
+
+    def encode(self, data):
+        """Encode a single car record into a 1 x n_features matrix"""
+        return self.encode_batch([data])
+
+    def encode_batch(self, records):
+        """Encode many car records into an n_records x n_features matrix"""
+        X = np.zeros((len(records), self.n_features_out), dtype='float64')
+
+        for block in self.numeric_blocks:
+            values = np.array([[self._numeric_value(record, col) for col in block.columns]
+                               for record in records], dtype='float64').reshape(len(records), block.width)
+            if block.fill is not None:
+                missing = np.isnan(values)
+                if missing.any():
+                    values[missing] = np.broadcast_to(block.fill, values.shape)[missing]
+            if block.mean is not None:
+                values -= block.mean
+            if block.scale is not None:
+                values /= block.scale
+            X[:, block.offset:block.offset + block.width] = values
+
+        for block in self.categorical_blocks:
+            for col, index_map, column_offset in zip(block.columns, block.index_maps, block.column_offsets):
+                default = self.defaults.get(col)
+                for row, record in enumerate(records):
+                    value = record.get(col)
+                    if value is None:
+                        value = default if default is not None else block.fill_value
+                    index = index_map.get(value)
+                    if index is not None:
+                        X[row, column_offset + index] = 1.0
+                    elif block.handle_unknown == 'error':
+                        raise ValueError(f"Found unknown category {value!r} in column '{col}'")
+
+        return X
+
+    def encode_grid(self, base, axes):
+        """Encode the base record over a grid of numeric feature values
+
+        axes is a list of (column, values) pairs; the result has one row per
+        point of their Cartesian product, first axis varying slowest. The base
+        row is encoded once and tiled, and only the varied columns are
+        rewritten, so no per-point records are built.
+        """
+        points = int(np.prod([len(values) for _, values in axes]))
+        X = np.repeat(self.encode_batch([base]), points, axis=0)
+        grids = np.meshgrid(*[np.asarray(values, dtype='float64') for _, values in axes], indexing='ij')
+        for (col, _), grid in zip(axes, grids):
+            block, j = self._numeric_column(col)
+            values = grid.reshape(-1)
+            if col in self.int_columns:
+                values = np.trunc(values)
+            if block.mean is not None:
+                values = values - block.mean[j]
+            if block.scale is not None:
+                values = values / block.scale[j]
+            X[:, block.offset + j] = values
+        return X
+
+    def _numeric_column(self, col):
+        for block in self.numeric_blocks:
+            if col in block.columns:
+                return block, block.columns.index(col)
+        raise ValueError(f"'{col}' is not a numeric model feature")
+
+    def _numeric_value(self, record, col):
+        value = record.get(col)
+        if value is None:
+            value = self.defaults.get(col, 0)
+        if col in self.int_columns:
+            return coerce_int(value)
+        return coerce_number(value)
+
+    def sample_records(self, count=8):
+        """Build synthetic records covering known categories for equivalence checks"""
+        records = [{}]
+        for i in range(count - 1):
+            record = {}
+            for block in self.categorical_blocks:
+                for col, index_map in zip(block.columns, block.index_maps):
+                    categories = list(index_map)
+                    if categories:
+                        record[col] = categories[(i * 7 + 3) % len(categories)]
+            for block in self.numeric_blocks:
+                for j, col in enumerate(block.columns):
+                    base = block.fill[j] if block.fill is not None else 1.0
+                    record[col] = base * (0.5 + 0.25 * i)
+            records.append(record)
+        return records
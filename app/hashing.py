@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+password_executor = None
+
+class HashingOverloaded(Exception):
+    """Raised when the password hashing pool cannot admit more work"""
+
+class BoundedExecutor:
+    """Thread pool that rejects work once running + queued tasks reach a limit"""
+
+    def __init__(self, max_workers, max_queue, thread_name_prefix='password-hash'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn, raising HashingOverloaded instead of queueing without bound"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingOverloaded("Password hashing queue is full")
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, timeout=None):
+        """Run fn on the pool and wait for its result"""
+        try:
+            return self.submit(fn, *args).result(timeout=timeout)
+        except FutureTimeoutError:
+            raise HashingOverloaded("Timed out waiting for password hashing")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'rejected': self.rejected
+            }
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+def init_password_hashing(app):
+    """Create the dedicated password hashing pool (PASSWORD_HASH_WORKERS=0 hashes inline)"""
+    global password_executor
+    if password_executor is not None:
+        password_executor.shutdown()
+        password_executor = None
+
+    if app.config['PASSWORD_HASH_WORKERS'] > 0:
+        password_executor = BoundedExecutor(
+            app.config['PASSWORD_HASH_WORKERS'],
+            app.config['PASSWORD_HASH_QUEUE_SIZE']
+        )
+    return password_executor
+
+def run_password_task(fn, *args, timeout=None):
+    """Run a slow password hash/check off the request thread when a pool is configured"""
+    if password_executor is None:
+        return fn(*args)
+    return password_executor.run(fn, *args, timeout=timeout)
@@ -0,0 +1,24 @@
+import hashlib
+from flask import current_app, request
+
+def make_etag(*parts):
+    """Hash the parts of a validator into an opaque entity tag"""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+def not_modified_response(etag):
+    """Return a 304 response when If-None-Match already holds etag, else None
+
+    Tags are weak: bodies carry a per-request request_id, so equal tags mean
+    equivalent rather than byte-identical representations.
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    return set_validators(response, etag)
+
+def set_validators(response, etag):
+    response.set_etag(etag, weak=True)
+    # Scope comes from the session cookie; clients must revalidate every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
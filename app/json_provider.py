@@ -0,0 +1,72 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.utils import import_string
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    """Serialize the non-JSON types our responses contain; datetimes become ISO 8601"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, with a stdlib fallback producing the same output
+
+    Unlike Flask's default provider, datetimes are emitted as ISO 8601 strings
+    rather than HTTP dates, so rows can be returned without pre-formatting.
+    """
+
+    def _orjson_options(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def _orjson_dumps(self, obj, option=0):
+        """orjson bytes, or None for values it can't encode (e.g. integers beyond 64 bits)"""
+        try:
+            return orjson.dumps(obj, default=_default, option=self._orjson_options() | option)
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            encoded = self._orjson_dumps(obj)
+            if encoded is not None:
+                return encoded.decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # orjson rejects NaN/Infinity and huge integers that json accepts
+                pass
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._orjson_dumps(obj, orjson.OPT_APPEND_NEWLINE) if orjson is not None else None
+        if body is None:
+            body = json.dumps(obj, default=_default, ensure_ascii=self.ensure_ascii,
+                              sort_keys=self.sort_keys, separators=(',', ':')) + '\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def init_json_provider(app):
+    """Install the JSONProvider class named by the JSON_PROVIDER import path"""
+    provider_class = import_string(app.config['JSON_PROVIDER'])
+    app.json = provider_class(app)
+    app.json.sort_keys = app.config['JSON_SORT_KEYS']
+    return app.json
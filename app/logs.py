@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Request fields attached through `extra=` by the middleware
+STRUCTURED_FIELDS = ('request_id', 'endpoint', 'method', 'path', 'status', 'duration_ms')
+
+listener = None
+process_queue = None
+_installed_handlers = []
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the request fields as top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread
+
+    The stock prepare() formats every record on the calling thread so it can
+    be pickled; an in-process queue doesn't need that.
+    """
+
+    def prepare(self, record):
+        return record
+
+class LogSampler:
+    """Decides which successful requests are logged
+
+    Every request is kept with probability ``base_rate``. With
+    ``target_per_second`` set, the probability also falls as traffic rises, so
+    about that many successful requests per second are logged per process
+    however busy it gets. Load is the larger of the last full second's count
+    and the current second's count so far.
+    """
+
+    def __init__(self, base_rate=1.0, target_per_second=0.0):
+        self.base_rate = base_rate
+        self.target_per_second = target_per_second
+        self._second = None
+        self._count = 0
+        self._previous = 0
+
+    def rate(self):
+        """Current probability of logging a successful request"""
+        load = max(self._previous, self._count)
+        if self.target_per_second <= 0 or load <= self.target_per_second:
+            return self.base_rate
+        return min(self.base_rate, self.target_per_second / load)
+
+    def sample(self):
+        """Count one request and decide whether its success is logged"""
+        now = int(time.monotonic())
+        if now != self._second:
+            # A gap of idle seconds means the last full second had no traffic
+            self._previous = self._count if self._second == now - 1 else 0
+            self._second = now
+            self._count = 0
+        self._count += 1
+        rate = self.rate()
+        return rate >= 1.0 or random.random() < rate
+
+def build_handlers(app):
+    """Console plus the (optionally rotating) LOG_FILE handler"""
+    formatter = JsonFormatter() if app.config['LOG_FORMAT'] == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+
+    log_file = app.config['LOG_FILE']
+    rotation = app.config['LOG_ROTATION']
+    if log_file and rotation == 'size':
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=app.config['LOG_MAX_BYTES'], backupCount=app.config['LOG_BACKUP_COUNT']))
+    elif log_file and rotation == 'time':
+        handlers.append(logging.handlers.TimedRotatingFileHandler(
+            log_file, when=app.config['LOG_ROTATE_WHEN'], backupCount=app.config['LOG_BACKUP_COUNT']))
+    elif log_file:
+        handlers.append(logging.FileHandler(log_file))
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def _install(*handlers):
+    root = logging.getLogger()
+    for handler in _installed_handlers:
+        root.removeHandler(handler)
+        if handler not in handlers:
+            handler.close()
+    _installed_handlers[:] = handlers
+    for handler in handlers:
+        root.addHandler(handler)
+
+def configure_logging(app, log_queue=None):
+    """Install the root handlers; with LOG_ASYNC they run on a background listener thread
+
+    Pass ``log_queue`` in serve.py workers to forward records to the listener
+    owned by the parent process, which is the only writer of LOG_FILE.
+    """
+    global listener, process_queue
+    logging.getLogger().setLevel(app.config['LOG_LEVEL'])
+
+    if log_queue is not None:
+        # The inherited listener belongs to the parent; stopping it here would
+        # send its shutdown sentinel through the shared queue
+        listener = None
+        process_queue = log_queue
+        _install(logging.handlers.QueueHandler(log_queue))
+        return
+
+    stop_logging()
+    handlers = build_handlers(app)
+    if not app.config['LOG_ASYNC']:
+        _install(*handlers)
+        return
+
+    record_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _install(DeferredQueueHandler(record_queue))
+
+def start_process_listener(app, log_queue):
+    """Drain records sent by forked workers into this process's handlers"""
+    global listener
+    stop_logging()
+    logging.getLogger().setLevel(app.config['LOG_LEVEL'])
+
+    handlers = build_handlers(app)
+    _install(*handlers)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+def stop_logging():
+    """Flush queued records and stop the listener, if one is running"""
+    global listener, process_queue
+    if listener is not None:
+        listener.stop()
+        # Keep logging synchronously through the listener's handlers
+        _install(*listener.handlers)
+        listener = None
+    if process_queue is not None:
+        _install()
+        process_queue.close()
+        process_queue.join_thread()
+        process_queue = None
+
+atexit.register(stop_logging)
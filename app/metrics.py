@@ -0,0 +1,183 @@
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy.pool import QueuePool
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers sub-millisecond model calls up to slow database writes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Fixed-bucket histogram; buckets are allocated up front so observe() only
+    bisects and increments under an uncontended lock"""
+
+    __slots__ = ('bounds', 'counts', 'total', '_lock', '_acquire', '_release')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+        # Bound methods are cheaper than a with-block on the hot path
+        self._acquire = self._lock.acquire
+        self._release = self._lock.release
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        self._acquire()
+        self.counts[index] += 1
+        self.total += value
+        self._release()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total
+
+class HistogramFamily:
+    """A histogram metric with one child per label combination"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Return the child histogram for the label values, creating it once"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def observe(self, value, *labels):
+        self.labels(*labels).observe(value)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for values, child in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(dict(labels, le=_format_value(float(bound))))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+class Gauge:
+    """A single value that goes up and down"""
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def expose(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge',
+                f'{self.name} {_format_value(self.value)}']
+
+class Registry:
+    """Metrics owned by this process plus callbacks that read other components' counters at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Register fn() -> [(name, type, help, [(labels, value), ...]), ...]"""
+        self._collectors.append(fn)
+        return fn
+
+    def expose(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        for collect in self._collectors:
+            for name, metric_type, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}' for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+request_latency = registry.register(HistogramFamily(
+    'http_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method', 'status')))
+requests_in_flight = registry.register(Gauge(
+    'http_requests_in_flight', 'Requests currently being handled'))
+stage_latency = registry.register(HistogramFamily(
+    'prediction_stage_duration_seconds', 'Time spent in each prediction stage', ('stage',)))
+pool_wait = registry.register(HistogramFamily(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled database connection (count is total checkouts)'))
+
+# Resolved once so the hot path skips the label lookup
+FEATURES_STAGE = stage_latency.labels('create_prediction_dataframe')
+MODEL_PREDICT_STAGE = stage_latency.labels('model_predict')
+SAVE_PREDICTION_STAGE = stage_latency.labels('save_prediction_to_db')
+INSERT_ROWS_STAGE = stage_latency.labels('insert_prediction_rows')
+POOL_WAIT = pool_wait.labels()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start)
+
+@registry.collector
+def collect_pool():
+    from . import database
+    pool = database.engine.pool if database.engine is not None else None
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        ('db_pool_size', 'gauge', 'Configured pool size', [({}, pool.size())]),
+        ('db_pool_checked_out', 'gauge', 'Connections currently checked out', [({}, pool.checkedout())]),
+        ('db_pool_overflow', 'gauge', 'Connections open beyond the pool size', [({}, max(pool.overflow(), 0))])
+    ]
+
+@registry.collector
+def collect_caches():
+    from .ml import prediction_cache
+    from .routes.auth import user_cache
+    stats = {'prediction': prediction_cache.stats(), 'user': user_cache.stats()}
+    return [
+        (f'cache_{field}{"_total" if metric_type == "counter" else ""}', metric_type, f'Cache {field}',
+         [({'cache': name}, cache_stats[field]) for name, cache_stats in stats.items()])
+        for field, metric_type in (('hits', 'counter'), ('misses', 'counter'), ('evictions', 'counter'), ('size', 'gauge'))
+    ]
+
+def metrics_text():
+    return registry.expose()
@@ -1,103 +1,390 @@
-import joblib
+import hashlib
+import math
 import numpy as np
-import pandas as pd
 import logging
+import time
+from .batching import BatcherStopped, MicroBatcher
+from .cache import TTLCache
+from .encoder import CompiledEncoder, coerce_int, coerce_number
+from .metrics import FEATURES_STAGE, MODEL_PREDICT_STAGE
+from .model_artifact import file_sha256, is_artifact, load_artifact, manifest_summary
+from .model_registry import ModelRegistry, ServingModel
+from .profiling import record_phase
 
-model = None
+prediction_cache = TTLCache()
+micro_batcher = None
+
+# Exact column order expected by the trained pipeline
+FEATURE_COLUMNS = [
+    'year', 'brand', 'color', 'carbon_fiber_body', 'engine_config',
+    'horsepower', 'torque', 'weight_kg', 'zero_to_60_s', 'top_speed_mph',
+    'num_doors', 'transmission', 'drivetrain', 'market_region', 'mileage',
+    'num_owners', 'interior_material', 'brake_type', 'tire_brand',
+    'aero_package', 'limited_edition', 'has_warranty', 'last_service_date',
+    'service_history', 'non_original_parts', 'model', 'warranty_years',
+    'damage', 'damage_cost', 'damage_type'
+]
+
+# Default values for missing columns
+FEATURE_DEFAULTS = {
+    'carbon_fiber_body': 0,
+    'aero_package': 0,
+    'limited_edition': 0,
+    'has_warranty': 0,
+    'non_original_parts': 0,
+    'damage': 0,
+    'year': 2020,
+    'horsepower': 0,
+    'torque': 0,
+    'weight_kg': 0,
+    'top_speed_mph': 0,
+    'num_doors': 2,
+    'mileage': 0,
+    'num_owners': 0,
+    'warranty_years': 0,
+    'zero_to_60_s': 0.0,
+    'damage_cost': 0.0,
+    'brand': 'unknown',
+    'color': 'unknown',
+    'engine_config': 'unknown',
+    'transmission': 'unknown',
+    'drivetrain': 'unknown',
+    'market_region': 'unknown',
+    'interior_material': 'unknown',
+    'brake_type': 'unknown',
+    'tire_brand': 'unknown',
+    'last_service_date': '',
+    'service_history': 'unknown',
+    'model': 'unknown',
+    'damage_type': 'none'
+}
+
+INT_COLUMNS = ['year', 'carbon_fiber_body', 'horsepower', 'torque', 'weight_kg',
+               'top_speed_mph', 'num_doors', 'mileage', 'num_owners',
+               'aero_package', 'limited_edition', 'has_warranty',
+               'non_original_parts', 'warranty_years', 'damage']
+FLOAT_COLUMNS = ['zero_to_60_s', 'damage_cost']
+
+REQUIRED_FIELDS = ['brand', 'model', 'year']
+
+# Features /predict/sweep can vary; categorical columns are one-hot encoded
+SWEEP_FEATURES = INT_COLUMNS + FLOAT_COLUMNS
+
+_INT_COLUMN_SET = frozenset(INT_COLUMNS)
+_FLOAT_COLUMN_SET = frozenset(FLOAT_COLUMNS)
+
+def load_model(path, use_compiled_encoder=True, logger=logging, mmap_mode='r', verify=True):
+    """Load the model at path and compile its encoder, returning an unpublished ServingModel
+
+    path is either an artifact directory written by export_model.py, whose
+    arrays are memory-mapped with mmap_mode, or a plain joblib pickle.
+    """
+    if is_artifact(path):
+        model, manifest = load_artifact(path, mmap_mode, verify)
+        model_info = manifest_summary(manifest)
+        import sklearn
+        if manifest['sklearn_version'] != sklearn.__version__:
+            logger.warning(f"Model artifact {manifest['version']} was exported with scikit-learn "
+                           f"{manifest['sklearn_version']}, running {sklearn.__version__}")
+    else:
+        import joblib
+        model = joblib.load(path)
+        model_info = {'format': 'pickle', 'version': None, 'sha256': file_sha256(path)}
+    
+    # Validate model has required methods
+    if not (hasattr(model, 'predict') and callable(model.predict)):
+        raise AttributeError("Loaded model does not have predict method")
+    
+    encoder = compile_encoder(model, logger) if use_compiled_encoder else None
+    return ServingModel(model, encoder, model_info['sha256'][:16], model_info, path)
+
+def warm_up(serving, rounds=3, rows=32):
+    """Score synthetic records with a candidate model before it takes traffic
+
+    Exercises the single-row and batch paths so the first real requests
+    don't pay for lazy initialization, and rejects models that return
+    non-finite prices.
+    """
+    if serving.encoder is not None:
+        records = serving.encoder.sample_records(rows)
+    else:
+        records = [{}] + [dict(FEATURE_DEFAULTS, year=2000 + i % 25, mileage=i * 1000) for i in range(rows - 1)]
+    for _ in range(max(rounds, 1)):
+        score_records(records[:1], serving)
+        prices = score_records(records, serving)
+    if not np.all(np.isfinite(prices)):
+        raise ValueError(f"Model version {serving.version} returned non-finite prices during warm-up")
+
+def _on_swap(serving, previous):
+    # Entries are keyed by model fingerprint, so the old version's prices are dead weight
+    if previous is not None:
+        prediction_cache.clear()
+
+registry = ModelRegistry(on_swap=_on_swap)
 
 def init_ml(app):
     """Load the trained model from file"""
-    global model
+    config = app.config
+    registry.load_fn = lambda path: load_model(
+        path, config['USE_COMPILED_ENCODER'], app.logger, config['MODEL_MMAP_MODE'], config['MODEL_VERIFY_CHECKSUM'])
+    registry.warm_up_fn = lambda serving: warm_up(serving, config['MODEL_WARMUP_ROUNDS'])
+    prediction_cache.configure(config['PREDICTION_CACHE_SIZE'], config['PREDICTION_CACHE_TTL'])
+    
+    if config['MODEL_LOAD_DEFERRED']:
+        # Serve liveness checks right away; /health/ready reports 503 until the
+        # background load publishes the model
+        registry.swap(config['MODEL_PATH'])
+        start_micro_batcher(app)
+        start_model_watcher(app)
+        app.logger.info(f"Loading model from {config['MODEL_PATH']} in the background")
+        return True
+    
     try:
-        model = joblib.load(app.config['MODEL_PATH'])
-        app.logger.info(f"Model loaded successfully from {app.config['MODEL_PATH']}")
+        serving = registry.load_fn(config['MODEL_PATH'])
+        registry.warm_up_fn(serving)
+        registry.publish(serving)
+        app.logger.info(f"Model loaded successfully from {config['MODEL_PATH']} (version {serving.version})")
+        prediction_cache.clear()
         
-        # Validate model has required methods
-        if not (hasattr(model, 'predict') and callable(model.predict)):
-            raise AttributeError("Loaded model does not have predict method")
-            
+        start_micro_batcher(app)
+        start_model_watcher(app)
         return True
     except Exception as e:
         app.logger.error(f"Error loading model: {str(e)}")
-        model = None
+        registry.current = None
+        prediction_cache.clear()
         return False
 
-def create_prediction_dataframe(data):
-    """Create a pandas DataFrame with the exact structure expected by the model"""
-    expected_columns = [
-        'year', 'brand', 'color', 'carbon_fiber_body', 'engine_config',
-        'horsepower', 'torque', 'weight_kg', 'zero_to_60_s', 'top_speed_mph',
-        'num_doors', 'transmission', 'drivetrain', 'market_region', 'mileage',
-        'num_owners', 'interior_material', 'brake_type', 'tire_brand',
-        'aero_package', 'limited_edition', 'has_warranty', 'last_service_date',
-        'service_history', 'non_original_parts', 'model', 'warranty_years',
-        'damage', 'damage_cost', 'damage_type'
-    ]
-    
-    # Create dictionary with default values
-    df_data = {col: [data.get(col)] if col in data else [None] for col in expected_columns}
-    
-    # Set default values for missing columns
-    defaults = {
-        'carbon_fiber_body': 0,
-        'aero_package': 0,
-        'limited_edition': 0,
-        'has_warranty': 0,
-        'non_original_parts': 0,
-        'damage': 0,
-        'year': 2020,
-        'horsepower': 0,
-        'torque': 0,
-        'weight_kg': 0,
-        'top_speed_mph': 0,
-        'num_doors': 2,
-        'mileage': 0,
-        'num_owners': 0,
-        'warranty_years': 0,
-        'zero_to_60_s': 0.0,
-        'damage_cost': 0.0,
-        'brand': 'unknown',
-        'color': 'unknown',
-        'engine_config': 'unknown',
-        'transmission': 'unknown',
-        'drivetrain': 'unknown',
-        'market_region': 'unknown',
-        'interior_material': 'unknown',
-        'brake_type': 'unknown',
-        'tire_brand': 'unknown',
-        'last_service_date': '',
-        'service_history': 'unknown',
-        'model': 'unknown',
-        'damage_type': 'none'
-    }
-    
-    for col, default in defaults.items():
-        if df_data[col][0] is None:
-            df_data[col][0] = default
-    
-    # Create DataFrame
-    df = pd.DataFrame(df_data)
-    
-    # Convert data types
-    int_cols = ['year', 'carbon_fiber_body', 'horsepower', 'torque', 'weight_kg',
-               'top_speed_mph', 'num_doors', 'mileage', 'num_owners',
-               'aero_package', 'limited_edition', 'has_warranty',
-               'non_original_parts', 'warranty_years', 'damage']
-    float_cols = ['zero_to_60_s', 'damage_cost']
+def start_model_watcher(app):
+    """(Re)start polling MODEL_PATH for a replacement model, if MODEL_WATCH_INTERVAL is set"""
+    registry.stop_watching()
+    if app.config['MODEL_WATCH_INTERVAL'] > 0:
+        registry.start_watching(app.config['MODEL_PATH'], app.config['MODEL_WATCH_INTERVAL'])
+
+def stop_model_watcher():
+    registry.stop_watching()
+
+def start_micro_batcher(app):
+    """(Re)start the micro-batcher that coalesces concurrent single predictions"""
+    global micro_batcher
+    stop_micro_batcher()
+    if app.config['MICROBATCH_ENABLED']:
+        micro_batcher = MicroBatcher(
+            _score_queued,
+            max_batch_size=app.config['MICROBATCH_MAX_SIZE'],
+            max_latency=app.config['MICROBATCH_MAX_LATENCY_MS'] / 1000.0
+        ).start()
+    return micro_batcher
+
+def stop_micro_batcher():
+    """Stop the micro-batcher; predictions fall back to direct model calls"""
+    global micro_batcher
+    if micro_batcher is not None:
+        micro_batcher.shutdown()
+        micro_batcher = None
+
+def compile_encoder(pipeline, logger=logging):
+    """Compile the pipeline's preprocessing into a NumPy encoder and verify it"""
+    try:
+        compiled = CompiledEncoder(pipeline, FEATURE_DEFAULTS, INT_COLUMNS, FLOAT_COLUMNS)
+        
+        # tests/test_encoder.py covers the edge cases against the bundled model; this
+        # check stays because hot-swapped models can bring pipelines the tests never saw
+        samples = compiled.sample_records()
+        expected = pipeline[:-1].transform(create_batch_dataframe(samples))
+        if hasattr(expected, 'toarray'):
+            expected = expected.toarray()
+        if not np.allclose(compiled.encode_batch(samples), expected, rtol=1e-9, atol=1e-12):
+            raise ValueError("Compiled encoder output does not match the pipeline")
+        
+        logger.info(f"Compiled feature encoder with {compiled.n_features_out} output columns")
+        return compiled
+    except Exception as e:
+        logger.warning(f"Falling back to sklearn pipeline preprocessing: {str(e)}")
+        return None
+
+def get_missing_fields(data):
+    """Return the required fields absent from a single car record"""
+    return [field for field in REQUIRED_FIELDS if field not in data]
+
+def validate_record(data):
+    """Raise ValueError for a car record whose values can't be both scored and stored"""
+    for col in FEATURE_COLUMNS:
+        value = data.get(col)
+        if value is None:
+            continue
+        if isinstance(value, (list, dict)):
+            raise ValueError(f"'{col}' must be a single value")
+        if col in _INT_COLUMN_SET or col in _FLOAT_COLUMN_SET:
+            try:
+                number = float(value)
+            except ValueError:
+                raise ValueError(f"'{col}' must be a number, got {value!r}")
+            if not math.isfinite(number):
+                raise ValueError(f"'{col}' must be a finite number")
+
+def normalize_features(data):
+    """Return the model features after defaults and type coercion, in column order"""
+    features = []
+    for col in FEATURE_COLUMNS:
+        value = data.get(col)
+        if value is None:
+            value = FEATURE_DEFAULTS[col]
+        if col in _INT_COLUMN_SET:
+            value = int(coerce_int(value))
+        elif col in _FLOAT_COLUMN_SET:
+            value = coerce_number(value)
+        features.append(value)
+    return tuple(features)
+
+def prediction_cache_key(data, serving):
+    """Canonical hash of the normalized features, scoped to the serving model"""
+    canonical = repr((serving.fingerprint, normalize_features(data))).encode('utf-8')
+    return hashlib.blake2b(canonical, digest_size=16).digest()
+
+def create_batch_dataframe(records):
+    """Create a DataFrame for many car records in a single columnar pass"""
+    # Deferred so create_app doesn't pay for pandas when the compiled encoder is used
+    import pandas as pd
+    columns = {}
+    for col in FEATURE_COLUMNS:
+        default = FEATURE_DEFAULTS[col]
+        columns[col] = [default if (value := record.get(col)) is None else value
+                        for record in records]
+    
+    df = pd.DataFrame(columns, columns=FEATURE_COLUMNS)
     
-    for col in int_cols:
+    # Convert data types once per column for the whole batch
+    for col in INT_COLUMNS:
         df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int64')
     
-    for col in float_cols:
+    for col in FLOAT_COLUMNS:
         df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0).astype('float64')
     
     return df
 
-def predict_price(data):
-    """Make a prediction using the loaded model"""
-    if model is None:
+def create_grid_dataframe(base, axes):
+    """DataFrame counterpart of CompiledEncoder.encode_grid: the base row tiled
+    over the Cartesian product of the (column, values) axes"""
+    points = int(np.prod([len(values) for _, values in axes]))
+    df = create_batch_dataframe([base])
+    df = df.iloc[np.zeros(points, dtype=np.intp)].reset_index(drop=True)
+    grids = np.meshgrid(*[np.asarray(values, dtype='float64') for _, values in axes], indexing='ij')
+    for (col, _), grid in zip(axes, grids):
+        values = grid.reshape(-1)
+        df[col] = np.trunc(values).astype('int64') if col in _INT_COLUMN_SET else values
+    return df
+
+def create_prediction_dataframe(data):
+    """Create a pandas DataFrame with the exact structure expected by the model"""
+    return create_batch_dataframe([data])
+
+def score_records(records, serving=None):
+    """Run one uncached model call over a list of car records"""
+    serving = serving or registry.current
+    if serving is None:
+        raise RuntimeError("Model not loaded")
+    
+    start = time.perf_counter()
+    if serving.encoder is not None:
+        features, estimator = serving.encoder.encode_batch(records), serving.encoder.estimator
+    else:
+        features, estimator = create_batch_dataframe(records), serving.model
+    built = time.perf_counter()
+    predictions = estimator.predict(features)
+    finished = time.perf_counter()
+    FEATURES_STAGE.observe(built - start)
+    MODEL_PREDICT_STAGE.observe(finished - built)
+    record_phase('features', built - start)
+    record_phase('inference', finished - built)
+    return np.asarray(predictions, dtype='float64').reshape(-1).tolist()
+
+def sweep_prices(base, axes, serving=None):
+    """Price the base car over a grid of numeric feature values with one model call
+
+    axes is a list of one or two (column, values) pairs; returns an array of
+    prices shaped like the grid (len(values_1)[, len(values_2)]).
+    """
+    serving = serving or registry.current
+    if serving is None:
+        raise RuntimeError("Model not loaded")
+    
+    start = time.perf_counter()
+    if serving.encoder is not None:
+        features, estimator = serving.encoder.encode_grid(base, axes), serving.encoder.estimator
+    else:
+        features, estimator = create_grid_dataframe(base, axes), serving.model
+    built = time.perf_counter()
+    predictions = estimator.predict(features)
+    finished = time.perf_counter()
+    FEATURES_STAGE.observe(built - start)
+    MODEL_PREDICT_STAGE.observe(finished - built)
+    record_phase('features', built - start)
+    record_phase('inference', finished - built)
+    return np.asarray(predictions, dtype='float64').reshape([len(values) for _, values in axes])
+
+def _score_queued(items):
+    """Micro-batcher callback for (serving, record) pairs
+
+    A batch only mixes model versions while a swap is in progress; those rows
+    are scored one by one with the version their request started with.
+    """
+    serving = items[0][0]
+    if all(item_serving is serving for item_serving, _ in items):
+        return score_records([record for _, record in items], serving)
+    return [score_records([record], item_serving)[0] for item_serving, record in items]
+
+def predict_price(data, serving=None):
+    """Make a prediction using the serving model (or the given ServingModel)"""
+    serving = serving or registry.current
+    if serving is None:
         raise RuntimeError("Model not loaded")
     
-    df = create_prediction_dataframe(data)
-    prediction = model.predict(df)
-    return float(prediction[0] if isinstance(prediction, np.ndarray) else float(prediction))
\ No newline at end of file
+    cache_key = None
+    if prediction_cache.max_size > 0:
+        cache_key = prediction_cache_key(data, serving)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    price = None
+    batcher = micro_batcher
+    if batcher is not None and batcher.running:
+        try:
+            price = batcher.predict((serving, data))
+        except BatcherStopped:
+            # Shut down while this record was being queued; score it directly instead
+            pass
+    if price is None:
+        price = score_records([data], serving)[0]
+    
+    if cache_key is not None:
+        prediction_cache.set(cache_key, price)
+    return price
+
+def predict_prices(records, serving=None):
+    """Predict prices for many car records with a single model call"""
+    serving = serving or registry.current
+    if serving is None:
+        raise RuntimeError("Model not loaded")
+    
+    if not records:
+        return []
+    
+    prices = [None] * len(records)
+    cache_keys = [None] * len(records)
+    if prediction_cache.max_size > 0:
+        for i, record in enumerate(records):
+            cache_keys[i] = prediction_cache_key(record, serving)
+            prices[i] = prediction_cache.get(cache_keys[i])
+    
+    # Only score the rows the cache could not answer
+    pending = [i for i, price in enumerate(prices) if price is None]
+    if pending:
+        predictions = score_records([records[i] for i in pending], serving)
+        for i, price in zip(pending, predictions):
+            prices[i] = price
+            if cache_keys[i] is not None:
+                prediction_cache.set(cache_keys[i], price)
+    
+    return prices
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+MANIFEST_NAME = 'manifest.json'
+PIPELINE_NAME = 'pipeline.joblib'
+FORMAT_VERSION = 1
+
+class ArtifactError(Exception):
+    """Raised when a model artifact is malformed or fails its checksum"""
+
+def is_artifact(path):
+    """True if path is an exported artifact directory rather than a plain pickle"""
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format {manifest.get('format_version')!r}")
+    return manifest
+
+def export_artifact(model, directory, version, source_path=None):
+    """Write model as an mmap-loadable artifact directory and return its manifest
+
+    The pipeline is dumped uncompressed, so joblib stores every NumPy array as
+    a raw aligned block that load_artifact can map instead of copying. The
+    manifest is written last: a directory without one is not an artifact.
+    """
+    import joblib
+    import sklearn
+    os.makedirs(directory, exist_ok=True)
+    pipeline_path = os.path.join(directory, PIPELINE_NAME)
+    joblib.dump(model, pipeline_path, compress=0)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'estimator': type(model).__name__,
+        'sklearn_version': sklearn.__version__,
+        'joblib_version': joblib.__version__,
+        'python_version': platform.python_version(),
+        'files': {
+            PIPELINE_NAME: {'sha256': file_sha256(pipeline_path), 'bytes': os.path.getsize(pipeline_path)}
+        }
+    }
+    if source_path:
+        manifest['source'] = {'path': os.path.basename(source_path), 'sha256': file_sha256(source_path)}
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, os.path.join(directory, MANIFEST_NAME))
+    return manifest
+
+def load_artifact(directory, mmap_mode='r', verify=True):
+    """Load an exported artifact, memory-mapping its arrays; returns (model, manifest)
+
+    With mmap_mode='r' the array pages are shared read-only between every
+    process that maps the same file. verify checks the pipeline file against
+    the manifest checksum before unpickling it.
+    """
+    import joblib
+    manifest = read_manifest(directory)
+    pipeline_path = os.path.join(directory, PIPELINE_NAME)
+    if verify and file_sha256(pipeline_path) != manifest['files'][PIPELINE_NAME]['sha256']:
+        raise ArtifactError(f"Checksum mismatch for {pipeline_path}")
+    return joblib.load(pipeline_path, mmap_mode=mmap_mode or None), manifest
+
+def manifest_summary(manifest):
+    """Fields reported by /health"""
+    return {
+        'format': 'artifact',
+        'version': manifest['version'],
+        'sha256': manifest['files'][PIPELINE_NAME]['sha256'],
+        'created_at': manifest['created_at'],
+        'estimator': manifest['estimator'],
+        'sklearn_version': manifest['sklearn_version']
+    }
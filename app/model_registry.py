@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+class ServingModel:
+    """A loaded model and its compiled encoder; never mutated once published"""
+
+    __slots__ = ('model', 'encoder', 'fingerprint', 'info', 'path', 'loaded_at')
+
+    def __init__(self, model, encoder, fingerprint, info, path):
+        self.model = model
+        self.encoder = encoder
+        self.fingerprint = fingerprint
+        self.info = info
+        self.path = path
+        self.loaded_at = datetime.utcnow()
+
+    @property
+    def version(self):
+        """The artifact's version label, or the checksum prefix for plain pickles"""
+        return self.info.get('version') or self.fingerprint
+
+def path_signature(path):
+    """Identity of the file at path; artifact directories are identified by their manifest"""
+    manifest = os.path.join(path, 'manifest.json')
+    target = manifest if os.path.isdir(path) else path
+    try:
+        stat = os.stat(target)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+class ModelRegistry:
+    """Holds the serving model and swaps replacements in atomically
+
+    Readers take ``current`` once per request and use that object throughout,
+    so a swap never changes the model under an in-flight request; the old
+    version is released when its last request drops the reference. Candidates
+    are loaded and warmed with ``load_fn``/``warm_up_fn`` off the request path,
+    one at a time.
+    """
+
+    def __init__(self, load_fn=None, warm_up_fn=None, on_swap=None):
+        self.current = None
+        self.load_fn = load_fn
+        self.warm_up_fn = warm_up_fn
+        self.on_swap = on_swap
+        self.swaps = 0
+        self.failed_swaps = 0
+        self.last_swap = None
+        self._loading = threading.Lock()
+        self._watcher = None
+        self._watch_stop = None
+
+    def publish(self, serving):
+        """Make serving the model for new requests; returns the previous one"""
+        previous, self.current = self.current, serving
+        if self.on_swap is not None:
+            self.on_swap(serving, previous)
+        return previous
+
+    def swap(self, path, background=True):
+        """Load, warm and publish the model at path
+
+        Returns False without doing anything if another candidate is still
+        loading. With background=True the work runs on a thread and
+        ``last_swap`` reports its progress.
+        """
+        if not self._loading.acquire(blocking=False):
+            return False
+        self.last_swap = {'state': 'loading', 'path': path, 'started_at': datetime.utcnow().isoformat()}
+        if background:
+            threading.Thread(target=self._load_and_publish, args=(path,), name='model-swap', daemon=True).start()
+        else:
+            self._load_and_publish(path)
+        return True
+
+    def _load_and_publish(self, path):
+        status = self.last_swap
+        try:
+            start = time.perf_counter()
+            candidate = self.load_fn(path)
+            status['state'] = 'warming'
+            status['version'] = candidate.version
+            if self.warm_up_fn is not None:
+                self.warm_up_fn(candidate)
+            previous = self.publish(candidate)
+            self.swaps += 1
+            status['state'] = 'ready'
+            status['previous_version'] = previous.version if previous is not None else None
+            status['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            logging.info(f"Model version {candidate.version} from {path} is now serving")
+        except Exception as e:
+            self.failed_swaps += 1
+            status['state'] = 'failed'
+            status['error'] = str(e)
+            logging.error(f"Model swap from {path} failed; keeping the current version: {str(e)}")
+        finally:
+            status['finished_at'] = datetime.utcnow().isoformat()
+            self._loading.release()
+
+    def wait(self, timeout=None):
+        """Block until no candidate is loading; returns False if timeout expires first"""
+        if not self._loading.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+        self._loading.release()
+        return True
+
+    def start_watching(self, path, interval):
+        """Poll path every interval seconds and swap in the model whenever it changes"""
+        self.stop_watching()
+        stop = threading.Event()
+        signature = path_signature(path)
+
+        def watch():
+            nonlocal signature
+            while not stop.wait(interval):
+                current = path_signature(path)
+                # Retried on the next tick if a previous swap is still loading
+                if current is not None and current != signature and self.swap(path, background=False):
+                    signature = current
+
+        self._watch_stop = stop
+        self._watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watch_stop.set()
+            self._watcher.join(timeout=5.0)
+            self._watcher = None
+            self._watch_stop = None
+
+    def stats(self):
+        serving = self.current
+        return {
+            'version': serving.version if serving is not None else None,
+            'path': serving.path if serving is not None else None,
+            'loaded_at': serving.loaded_at.isoformat() if serving is not None else None,
+            'swaps': self.swaps,
+            'failed_swaps': self.failed_swaps,
+            'last_swap': self.last_swap,
+            'watching': self._watcher is not None and self._watcher.is_alive()
+        }
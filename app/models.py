@@ -1,5 +1,5 @@
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Boolean, Index
 from datetime import datetime
 from typing import Dict
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -19,8 +19,8 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime, nullable=True)
     
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, method='scrypt'):
+        self.password_hash = generate_password_hash(password, method=method)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -118,3 +118,36 @@ class CarPrediction(Base):
             'request_id': self.request_id,
             'user_id': self.user_id
         }
+
+# Indexes for the history and stats query patterns. The pg_trgm indexes backing
+# the ILIKE '%...%' brand/model filters are PostgreSQL-only and live in the
+# 0001_history_stats_indexes migration.
+Index('ix_car_predictions_user_created', CarPrediction.user_id,
+      CarPrediction.created_at.desc(), CarPrediction.id.desc())
+Index('ix_car_predictions_created', CarPrediction.created_at.desc(), CarPrediction.id.desc())
+Index('ix_car_predictions_user_brand', CarPrediction.user_id, CarPrediction.brand)
+
+# Rollup scope holding aggregates over every user's predictions
+GLOBAL_ROLLUP_SCOPE = 0
+
+class PredictionBrandRollup(Base):
+    """Running price aggregates per (user scope, brand)"""
+    __tablename__ = 'prediction_brand_rollups'
+    user_id = Column(Integer, primary_key=True)  # GLOBAL_ROLLUP_SCOPE for all users
+    brand = Column(String(100), primary_key=True)
+    prediction_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0.0)
+    price_sum_sq = Column(Float, nullable=False, default=0.0)
+    price_min = Column(Float, nullable=True)
+    price_max = Column(Float, nullable=True)
+
+class PredictionDailyRollup(Base):
+    """Running price aggregates per (user scope, UTC day)"""
+    __tablename__ = 'prediction_daily_rollups'
+    user_id = Column(Integer, primary_key=True)  # GLOBAL_ROLLUP_SCOPE for all users
+    day = Column(Date, primary_key=True)
+    prediction_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0.0)
+    price_sum_sq = Column(Float, nullable=False, default=0.0)
+    price_min = Column(Float, nullable=True)
+    price_max = Column(Float, nullable=True)
@@ -0,0 +1,53 @@
+import cProfile
+import os
+import re
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context
+
+SAFE_PROFILE_NAME = re.compile(r'^[A-Za-z0-9_.-]{1,128}$')
+
+def record_phase(name, seconds):
+    """Add a phase to the current request's Server-Timing header (no-op off request threads)"""
+    if has_request_context():
+        g.setdefault('server_timing', []).append((name, seconds))
+
+@contextmanager
+def timed_phase(name):
+    """Time the enclosed block as a Server-Timing phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+def server_timing_header(phases, total):
+    """Format phases as 'name;dur=<ms>' entries followed by the total"""
+    entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in phases]
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ', '.join(entries)
+
+def profiling_requested(app, headers):
+    """X-Profile: 1 only takes effect when PROFILING_ENABLED is set and the token matches"""
+    if headers.get('X-Profile') != '1' or not app.config['PROFILING_ENABLED']:
+        return False
+    token = app.config['PROFILING_TOKEN']
+    return not token or headers.get('X-Profile-Token') == token
+
+def start_profiler():
+    """Start a cProfile profiler for the current thread, or None if another profiler is active"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+def stop_profiler(profiler, directory, request_id):
+    """Stop the profiler and write <request_id>.prof; returns the file path"""
+    profiler.disable()
+    name = request_id if SAFE_PROFILE_NAME.match(request_id) else f"profile-{time.time_ns()}"
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.prof")
+    profiler.dump_stats(path)
+    return path
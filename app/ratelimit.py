@@ -0,0 +1,218 @@
+import hashlib
+import math
+import mmap
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+
+limiter = None
+
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'limit', 'remaining', 'retry_after'])
+
+def parse_rate_limits(spec):
+    """Parse 'endpoint=limit/seconds,...' into {endpoint: (limit, seconds)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        endpoint, _, rule = item.partition('=')
+        limit, _, seconds = rule.partition('/')
+        limits[endpoint.strip()] = (int(limit), float(seconds or 60))
+    return limits
+
+def _slide(window_id, current, previous, now_window):
+    """Roll a key's counters forward to now_window, returning (current, previous)"""
+    if now_window == window_id:
+        return current, previous
+    if now_window == window_id + 1:
+        return 0.0, current
+    return 0.0, 0.0
+
+def _decide(current, previous, limit, window, elapsed):
+    """Apply the approximated sliding window: the previous window's count is
+    weighted by how much of it still overlaps the trailing window"""
+    weight = 1.0 - elapsed / window
+    estimate = previous * weight + current
+    if estimate + 1 <= limit:
+        return True, int(limit - estimate - 1), 0.0
+
+    if current + 1 > limit or previous == 0:
+        retry_after = window - elapsed
+    else:
+        # Time until enough of the previous window has slid out
+        retry_after = window * (1.0 - (limit - 1 - current) / previous) - elapsed
+    return False, 0, max(retry_after, 0.0)
+
+class RateLimitBackend:
+    """Counter storage for the rate limiter
+
+    ``hit`` records one request for ``key`` if it fits within ``limit`` per
+    ``window`` seconds and returns a RateLimitResult. Implementations must be
+    safe to call from concurrent request threads.
+    """
+
+    def hit(self, key, limit, window, now=None):
+        raise NotImplementedError
+
+    def sweep(self, now=None):
+        """Forget keys that have been idle for more than two windows"""
+        return 0
+
+    def stats(self):
+        return {}
+
+class LocalBackend(RateLimitBackend):
+    """Per-process counters: three numbers per active key, swept periodically"""
+
+    def __init__(self, sweep_interval=60.0):
+        self.sweep_interval = sweep_interval
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def hit(self, key, limit, window, now=None):
+        now = time.monotonic() if now is None else now
+        now_window = int(now // window)
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                state = self._keys[key] = [now_window, 0.0, 0.0, window]
+            else:
+                state[1], state[2] = _slide(state[0], state[1], state[2], now_window)
+                state[0] = now_window
+
+            allowed, remaining, retry_after = _decide(state[1], state[2], limit, window, now - now_window * window)
+            if allowed:
+                state[1] += 1
+
+        if now - self._last_sweep > self.sweep_interval:
+            self.sweep(now)
+        return RateLimitResult(allowed, limit, remaining, retry_after)
+
+    def sweep(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            idle = [key for key, (window_id, _, _, window) in self._keys.items()
+                    if int(now // window) > window_id + 1]
+            for key in idle:
+                del self._keys[key]
+        return len(idle)
+
+    def stats(self):
+        return {'backend': 'local', 'active_keys': len(self._keys)}
+
+class SharedMemoryBackend(RateLimitBackend):
+    """Fixed-size counter table in anonymous shared memory
+
+    Created before serve.py forks, so every worker updates the same counters,
+    standing in for an external store such as Redis. Each slot records the
+    fingerprint of the key that owns it. A key probes up to ``PROBE_LENGTH``
+    slots from its hash for its own slot, then a free or expired one. Only
+    when all of them are held by active keys is the one expiring soonest
+    reclaimed; that key's count restarts, and ``evictions`` records it.
+    """
+
+    SLOT_DTYPE = np.dtype([('fingerprint', '<u8'), ('window_id', '<i8'), ('current', '<f8'),
+                           ('previous', '<f8'), ('expires_at', '<f8')])
+    PROBE_LENGTH = 8
+
+    def __init__(self, slots=65536):
+        self.slots = slots
+        self._buffer = mmap.mmap(-1, slots * self.SLOT_DTYPE.itemsize)
+        self._table = np.ndarray((slots,), dtype=self.SLOT_DTYPE, buffer=self._buffer)
+        self._evictions = multiprocessing.Value('q', 0, lock=False)
+        self._lock = multiprocessing.Lock()
+
+    def _find_slot(self, fingerprint, now):
+        """Index of the key's own slot, else a free or expired one, else the one expiring soonest"""
+        candidates = [(fingerprint + i) % self.slots for i in range(min(self.PROBE_LENGTH, self.slots))]
+        free = None
+        for index in candidates:
+            owner = self._table['fingerprint'][index]
+            if owner == fingerprint:
+                return index
+            if free is None and (owner == 0 or self._table['expires_at'][index] <= now):
+                free = index
+        if free is not None:
+            return free
+        self._evictions.value += 1
+        return min(candidates, key=lambda index: self._table['expires_at'][index])
+
+    def hit(self, key, limit, window, now=None):
+        # Wall-clock time, since monotonic clocks are not comparable across processes
+        now = time.time() if now is None else now
+        now_window = int(now // window)
+        # Zero marks a free slot
+        fingerprint = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+        with self._lock:
+            slot = self._table[self._find_slot(fingerprint, now)]
+            if slot['fingerprint'] != fingerprint:
+                slot['fingerprint'], slot['window_id'], slot['current'], slot['previous'] = fingerprint, now_window, 0.0, 0.0
+            current, previous = _slide(int(slot['window_id']), float(slot['current']), float(slot['previous']), now_window)
+
+            allowed, remaining, retry_after = _decide(current, previous, limit, window, now - now_window * window)
+            slot['window_id'] = now_window
+            slot['current'] = current + 1 if allowed else current
+            slot['previous'] = previous
+            # Counts matter until the next window has fully slid past this one
+            slot['expires_at'] = (now_window + 2) * window
+
+        return RateLimitResult(allowed, limit, remaining, retry_after)
+
+    def stats(self):
+        return {'backend': 'shared', 'slots': self.slots,
+                'used_slots': int(np.count_nonzero(self._table['expires_at'] > time.time())),
+                'evictions': self._evictions.value}
+
+class RateLimiter:
+    """Per-endpoint request limits keyed by user id, or client IP for anonymous requests"""
+
+    def __init__(self, backend, limits):
+        self.backend = backend
+        self.limits = limits
+        self.allowed = 0
+        self.rejected = 0
+
+    def check(self, endpoint, identity):
+        """Return a RateLimitResult, or None when the endpoint is not limited"""
+        rule = self.limits.get(endpoint)
+        if rule is None:
+            return None
+        limit, window = rule
+        result = self.backend.hit(f"{endpoint}:{identity}", limit, window)
+        if result.allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return result
+
+    def stats(self):
+        return dict(self.backend.stats(), enabled=True, limits=self.limits,
+                    allowed=self.allowed, rejected=self.rejected)
+
+def create_backend(app):
+    if app.config['RATE_LIMIT_BACKEND'] == 'shared':
+        return SharedMemoryBackend(app.config['RATE_LIMIT_SHARED_SLOTS'])
+    return LocalBackend(app.config['RATE_LIMIT_SWEEP_INTERVAL'])
+
+def init_rate_limiter(app, backend=None):
+    """Create the limiter from RATE_LIMITS; pass backend to plug in shared storage"""
+    global limiter
+    if not app.config['RATE_LIMIT_ENABLED']:
+        limiter = None
+        return None
+
+    limiter = RateLimiter(backend or create_backend(app), parse_rate_limits(app.config['RATE_LIMITS']))
+    app.logger.info(f"Rate limiting enabled for {', '.join(sorted(limiter.limits)) or 'no endpoints'}")
+    return limiter
+
+def rate_limit_headers(result):
+    headers = {
+        'X-RateLimit-Limit': str(result.limit),
+        'X-RateLimit-Remaining': str(result.remaining)
+    }
+    if not result.allowed:
+        headers['Retry-After'] = str(max(1, math.ceil(result.retry_after)))
+    return headers
@@ -0,0 +1,200 @@
+import math
+from datetime import datetime, time, timedelta
+from sqlalchemy import func, insert, select, delete, literal
+from sqlalchemy.exc import IntegrityError
+from .models import CarPrediction, PredictionBrandRollup, PredictionDailyRollup, GLOBAL_ROLLUP_SCOPE
+
+AGGREGATE_COLUMNS = ['prediction_count', 'price_sum', 'price_sum_sq', 'price_min', 'price_max']
+
+def _dialect_upsert(session):
+    """Return the dialect's INSERT .. ON CONFLICT construct and its LEAST/GREATEST functions,
+    or Nones for dialects that need the portable fallback"""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert, func.least, func.greatest
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return dialect_insert, func.min, func.max
+    return None, None, None
+
+def _accumulate(buckets, key, price):
+    bucket = buckets.get(key)
+    if bucket is None:
+        buckets[key] = [1, price, price * price, price, price]
+    else:
+        bucket[0] += 1
+        bucket[1] += price
+        bucket[2] += price * price
+        bucket[3] = min(bucket[3], price)
+        bucket[4] = max(bucket[4], price)
+
+def _upsert(session, model, key_columns, buckets):
+    if not buckets:
+        return
+
+    dialect_insert, least, greatest = _dialect_upsert(session)
+    if dialect_insert is None:
+        _upsert_portable(session, model, key_columns, buckets)
+        return
+    table = model.__table__
+
+    # Sorted keys give concurrent writers a consistent row lock order
+    values = [dict(zip(key_columns, key), **dict(zip(AGGREGATE_COLUMNS, bucket)))
+              for key, bucket in sorted(buckets.items())]
+    statement = dialect_insert(table).values(values)
+    excluded = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={
+            'prediction_count': table.c.prediction_count + excluded.prediction_count,
+            'price_sum': table.c.price_sum + excluded.price_sum,
+            'price_sum_sq': table.c.price_sum_sq + excluded.price_sum_sq,
+            'price_min': least(table.c.price_min, excluded.price_min),
+            'price_max': greatest(table.c.price_max, excluded.price_max)
+        }
+    )
+    session.execute(statement)
+
+def _merge(existing, bucket):
+    existing.prediction_count += bucket[0]
+    existing.price_sum += bucket[1]
+    existing.price_sum_sq += bucket[2]
+    existing.price_min = bucket[3] if existing.price_min is None else min(existing.price_min, bucket[3])
+    existing.price_max = bucket[4] if existing.price_max is None else max(existing.price_max, bucket[4])
+
+def _upsert_portable(session, model, key_columns, buckets):
+    """SELECT .. FOR UPDATE, then update or insert, for dialects without ON CONFLICT"""
+    for key, bucket in sorted(buckets.items()):
+        criteria = [getattr(model, column) == value for column, value in zip(key_columns, key)]
+        existing = session.query(model).filter(*criteria).with_for_update().one_or_none()
+        if existing is not None:
+            _merge(existing, bucket)
+            continue
+        try:
+            # A concurrent writer may insert the same key first; retry as an update
+            with session.begin_nested():
+                session.add(model(**dict(zip(key_columns, key)), **dict(zip(AGGREGATE_COLUMNS, bucket))))
+        except IntegrityError:
+            _merge(session.query(model).filter(*criteria).with_for_update().one(), bucket)
+    session.flush()
+
+def update_rollups(session, rows):
+    """Fold new prediction rows into the rollup tables within the caller's transaction"""
+    brand_buckets = {}
+    daily_buckets = {}
+    for row in rows:
+        price = row.get('predicted_price')
+        if price is None:
+            continue
+        price = float(price)
+        day = (row.get('created_at') or datetime.utcnow()).date()
+
+        # brand is the raw request value; the String column stores it as text,
+        # and the keys must be comparable for the lock-order sort
+        brand = str(row['brand'])
+        scopes = [GLOBAL_ROLLUP_SCOPE]
+        if row.get('user_id'):
+            scopes.append(row['user_id'])
+        for scope in scopes:
+            _accumulate(brand_buckets, (scope, brand), price)
+            _accumulate(daily_buckets, (scope, day), price)
+
+    _upsert(session, PredictionBrandRollup, ['user_id', 'brand'], brand_buckets)
+    _upsert(session, PredictionDailyRollup, ['user_id', 'day'], daily_buckets)
+
+def rebuild_rollups(session):
+    """Recompute every rollup row from car_predictions (catch-up job)"""
+    session.execute(delete(PredictionBrandRollup))
+    session.execute(delete(PredictionDailyRollup))
+
+    price = CarPrediction.predicted_price
+    aggregates = [
+        func.count(CarPrediction.id),
+        func.coalesce(func.sum(price), 0.0),
+        func.coalesce(func.sum(price * price), 0.0),
+        func.min(price),
+        func.max(price)
+    ]
+    day = func.date(CarPrediction.created_at)
+    priced = CarPrediction.predicted_price.isnot(None)
+
+    for model, key_column, key in ((PredictionBrandRollup, 'brand', CarPrediction.brand),
+                                   (PredictionDailyRollup, 'day', day)):
+        columns = ['user_id', key_column] + AGGREGATE_COLUMNS
+        global_rows = select(literal(GLOBAL_ROLLUP_SCOPE), key, *aggregates).where(priced).group_by(key)
+        user_rows = select(CarPrediction.user_id, key, *aggregates)\
+            .where(priced, CarPrediction.user_id.isnot(None))\
+            .group_by(CarPrediction.user_id, key)
+        session.execute(insert(model).from_select(columns, global_rows))
+        session.execute(insert(model).from_select(columns, user_rows))
+
+def ensure_rollups(session):
+    """Backfill the rollups when they are empty but predictions already exist"""
+    has_rollups = session.query(PredictionBrandRollup.user_id).limit(1).first() is not None
+    has_predictions = session.query(CarPrediction.id).limit(1).first() is not None
+    if has_predictions and not has_rollups:
+        rebuild_rollups(session)
+        return True
+    return False
+
+def read_prediction_stats(session, user_id=None, now=None):
+    """Compute the /predictions/stats numbers from the rollup tables"""
+    scope = user_id or GLOBAL_ROLLUP_SCOPE
+    now = now or datetime.utcnow()
+
+    brand_rows = session.query(PredictionBrandRollup)\
+        .filter(PredictionBrandRollup.user_id == scope)\
+        .all()
+
+    total = sum(row.prediction_count for row in brand_rows)
+    price_sum = sum(row.price_sum for row in brand_rows)
+    price_sum_sq = sum(row.price_sum_sq for row in brand_rows)
+    minimums = [row.price_min for row in brand_rows if row.price_min is not None]
+    maximums = [row.price_max for row in brand_rows if row.price_max is not None]
+
+    # Sample standard deviation, matching PostgreSQL's stddev()
+    stddev = 0.0
+    if total > 1:
+        variance = (price_sum_sq - price_sum * price_sum / total) / (total - 1)
+        stddev = math.sqrt(max(variance, 0.0))
+
+    popular_brands = sorted(brand_rows, key=lambda row: row.prediction_count, reverse=True)[:5]
+
+    # Whole days inside the window come from daily rollups; only the partial
+    # first day is counted from car_predictions
+    window_start = now - timedelta(days=1)
+    next_day = datetime.combine(window_start.date() + timedelta(days=1), time.min)
+    full_days = session.query(func.coalesce(func.sum(PredictionDailyRollup.prediction_count), 0))\
+        .filter(PredictionDailyRollup.user_id == scope, PredictionDailyRollup.day >= next_day.date())\
+        .scalar()
+    partial_query = session.query(func.count(CarPrediction.id))\
+        .filter(CarPrediction.created_at >= window_start, CarPrediction.created_at < next_day,
+                CarPrediction.predicted_price.isnot(None))
+    if user_id:
+        partial_query = partial_query.filter(CarPrediction.user_id == user_id)
+
+    return {
+        'total_predictions': total,
+        'average_price': price_sum / total if total else 0.0,
+        'maximum_price': max(maximums) if maximums else 0.0,
+        'minimum_price': min(minimums) if minimums else 0.0,
+        'price_standard_deviation': stddev,
+        'popular_brands': [{'brand': row.brand, 'count': row.prediction_count} for row in popular_brands],
+        'recent_predictions_24h': int(full_days or 0) + partial_query.scalar()
+    }
+
+def read_scope_version(session, user_id=None):
+    """Cheap change marker for a user's (or everyone's) predictions: the rollup
+    row count plus the newest (created_at, id), both served by indexes"""
+    scope = user_id or GLOBAL_ROLLUP_SCOPE
+    count = session.query(func.coalesce(func.sum(PredictionBrandRollup.prediction_count), 0))\
+        .filter(PredictionBrandRollup.user_id == scope)\
+        .scalar()
+
+    latest_query = session.query(CarPrediction.created_at, CarPrediction.id)
+    if user_id:
+        latest_query = latest_query.filter(CarPrediction.user_id == user_id)
+    latest = latest_query.order_by(CarPrediction.created_at.desc(), CarPrediction.id.desc()).first()
+
+    return (scope, int(count or 0)) + (tuple(latest) if latest else (None, None))
@@ -1,12 +1,58 @@
-from flask import Blueprint, request, jsonify, g, session, render_template
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, jsonify, g, session, render_template, current_app
 from datetime import datetime
+from sqlalchemy import event
 import logging
-from ..database import SessionLocal
+from ..cache import TTLCache
+from ..database import get_request_session
+from ..hashing import HashingOverloaded, run_password_task
+from ..utils import read_db_session
 from ..models import User
 
 auth_bp = Blueprint('auth', __name__)
 
+# to_dict() of recently seen users, keyed by user id
+user_cache = TTLCache()
+
+@auth_bp.record_once
+def configure_user_cache(state):
+    user_cache.configure(state.app.config['USER_CACHE_SIZE'], state.app.config['USER_CACHE_TTL'])
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    """Drop a user's cached fields whenever the ORM changes the row (profile, is_active)"""
+    user_cache.invalidate(target.id)
+
+def get_cached_user(user_id):
+    """Return the user's to_dict() fields from the cache, loading them on a miss"""
+    user_data = user_cache.get(user_id)
+    if user_data is not None:
+        return user_data
+    
+    user = read_db_session().query(User).filter(User.id == user_id).first()
+    if not user:
+        return None
+    user_data = user.to_dict()
+    
+    user_cache.set(user_id, user_data)
+    return user_data
+
+def hash_password_task(fn, *args):
+    """Run a password hash or check on the bounded hashing pool"""
+    return run_password_task(fn, *args, timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+
+def hashing_overloaded_response():
+    """503 asking the client to retry once the password hashing queue drains"""
+    response = jsonify({
+        'error': 'Service busy',
+        'message': 'Too many authentication requests. Please try again shortly.',
+        'error_code': 'AUTH_OVERLOADED',
+        'request_id': g.get('request_id', 'unknown')
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(current_app.config['PASSWORD_HASH_RETRY_AFTER'])
+    return response
+
 @auth_bp.route('/auth/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -154,7 +200,7 @@ def register():
         
         # Database operations
         try:
-            db_session = SessionLocal()
+            db_session = get_request_session()
         except Exception as db_error:
             logging.error(f"Database connection error during registration: {str(db_error)}")
             return jsonify({
@@ -215,7 +261,10 @@ def register():
                     first_name=first_name,
                     last_name=last_name
                 )
-                user.set_password(password)
+                hash_password_task(user.set_password, password, current_app.config['PASSWORD_HASH_METHOD'])
+            except HashingOverloaded:
+                logging.warning(f"Password hashing queue full, rejecting registration for {username}")
+                return hashing_overloaded_response()
             except Exception as user_creation_error:
                 logging.error(f"User object creation error: {str(user_creation_error)}")
                 return jsonify({
@@ -274,12 +323,6 @@ def register():
             'error_code': 'UNEXPECTED_ERROR',
             'request_id': g.get('request_id', 'unknown')
         }), 500
-    finally:
-        if db_session:
-            try:
-                db_session.close()
-            except Exception as close_error:
-                logging.error(f"Error closing database session: {str(close_error)}")
 
 @auth_bp.route('/auth/login', methods=['POST'])
 def login():
@@ -354,7 +397,7 @@ def login():
         
         # Database operations
         try:
-            db_session = SessionLocal()
+            db_session = get_request_session()
         except Exception as db_error:
             logging.error(f"Database connection error: {str(db_error)}")
             return jsonify({
@@ -380,7 +423,10 @@ def login():
             
             # Check password
             try:
-                password_valid = user.check_password(password)
+                password_valid = hash_password_task(user.check_password, password)
+            except HashingOverloaded:
+                logging.warning(f"Password hashing queue full, rejecting login for {username}")
+                return hashing_overloaded_response()
             except Exception as pwd_error:
                 logging.error(f"Password verification error for user {username}: {str(pwd_error)}")
                 return jsonify({
@@ -431,10 +477,12 @@ def login():
                 }), 500
             
             logging.info(f"Successful login for user: {username}")
+            user_data = user.to_dict()
+            user_cache.set(user.id, user_data)
             return jsonify({
                 'success': True,
                 'message': 'Login successful',
-                'user': user.to_dict(),
+                'user': user_data,
                 'request_id': g.get('request_id', 'unknown')
             })
             
@@ -462,19 +510,20 @@ def login():
             'error_code': 'UNEXPECTED_ERROR',
             'request_id': g.get('request_id', 'unknown')
         }), 500
-    finally:
-        if db_session:
-            try:
-                db_session.close()
-            except Exception as close_error:
-                logging.error(f"Error closing database session: {str(close_error)}")
 
 @auth_bp.route('/auth/logout', methods=['POST'])
 def logout():
     """Logout user"""
     try:
-        # Clear session
+        # Clear session and the cached user fields
+        user_id = session.get('user_id')
+        if user_id:
+            user_cache.invalidate(user_id)
+        # The read-your-writes pin outlives the login; the client's writes are still on the primary only
+        last_write_at = session.get('last_write_at')
         session.clear()
+        if last_write_at is not None:
+            session['last_write_at'] = last_write_at
         
         return jsonify({
             'success': True,
@@ -493,7 +542,6 @@ def logout():
 @auth_bp.route('/auth/profile', methods=['GET'])
 def get_profile():
     """Get current user profile"""
-    db_session = None
     try:
         user_id = session.get('user_id')
         if not user_id:
@@ -503,10 +551,9 @@ def get_profile():
                 'request_id': g.get('request_id', 'unknown')
             }), 401
         
-        db_session = SessionLocal()
-        user = db_session.query(User).filter(User.id == user_id).first()
+        user_data = get_cached_user(user_id)
         
-        if not user:
+        if not user_data:
             return jsonify({
                 'error': 'User not found',
                 'message': 'User account not found',
@@ -515,7 +562,7 @@ def get_profile():
         
         return jsonify({
             'success': True,
-            'user': user.to_dict(),
+            'user': user_data,
             'request_id': g.get('request_id', 'unknown')
         })
         
@@ -526,14 +573,10 @@ def get_profile():
             'message': str(e),
             'request_id': g.get('request_id', 'unknown')
         }), 500
-    finally:
-        if db_session:
-            db_session.close()
 
 @auth_bp.route('/auth/check', methods=['GET'])
 def check_auth():
     """Check if user is authenticated"""
-    db_session = None
     try:
         user_id = session.get('user_id')
         if not user_id:
@@ -542,10 +585,9 @@ def check_auth():
                 'request_id': g.get('request_id', 'unknown')
             })
         
-        db_session = SessionLocal()
-        user = db_session.query(User).filter(User.id == user_id).first()
+        user_data = get_cached_user(user_id)
         
-        if not user or not user.is_active:
+        if not user_data or not user_data['is_active']:
             return jsonify({
                 'authenticated': False,
                 'request_id': g.get('request_id', 'unknown')
@@ -553,7 +595,7 @@ def check_auth():
         
         return jsonify({
             'authenticated': True,
-            'user': user.to_dict(),
+            'user': user_data,
             'request_id': g.get('request_id', 'unknown')
         })
         
@@ -564,9 +606,6 @@ def check_auth():
             'error': str(e),
             'request_id': g.get('request_id', 'unknown')
         })
-    finally:
-        if db_session:
-            db_session.close()
 
 # Page routes for serving HTML templates
 @auth_bp.route('/auth/login')
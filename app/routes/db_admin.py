@@ -1,27 +1,60 @@
 from flask import Blueprint, jsonify, g
-from ..database import init_db, SessionLocal
+from .. import database
+from ..database import create_schema, pool_stats
+from ..utils import admin_token_valid
 
 db_admin_bp = Blueprint('db_admin', __name__)
 
 @db_admin_bp.route('/database/init', methods=['POST'])
 def initialize_database():
-    """Initialize/recreate database tables"""
+    """Create any missing tables and backfill the stats rollups"""
+    if not admin_token_valid():
+        return jsonify({
+            'error': 'Forbidden',
+            'message': 'A valid X-Admin-Token header is required (MODEL_ADMIN_TOKEN must be set)',
+            'request_id': g.get('request_id', 'unknown')
+        }), 403
+    
+    if database.engine is None:
+        return jsonify({
+            'error': 'Database not available',
+            'request_id': g.get('request_id', 'unknown')
+        }), 503
+    
     try:
-        success = init_db()
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Database initialized successfully',
-                'request_id': g.get('request_id', 'unknown')
-            })
+        create_schema()
         return jsonify({
-            'success': False,
-            'message': 'Database initialization failed',
+            'success': True,
+            'message': 'Database initialized successfully',
             'request_id': g.get('request_id', 'unknown')
-        }), 500
+        })
     except Exception as e:
         return jsonify({
             'error': 'Database initialization error',
             'message': str(e),
             'request_id': g.get('request_id', 'unknown')
-        }), 500
\ No newline at end of file
+        }), 500
+
+@db_admin_bp.route('/database/pool', methods=['GET'])
+def get_pool_stats():
+    """Report connection pool checkouts, wait times and leaked sessions"""
+    # Leak reports name the requests holding connections
+    if not admin_token_valid():
+        return jsonify({
+            'error': 'Forbidden',
+            'message': 'A valid X-Admin-Token header is required (MODEL_ADMIN_TOKEN must be set)',
+            'request_id': g.get('request_id', 'unknown')
+        }), 403
+    
+    if database.engine is None:
+        return jsonify({
+            'error': 'Database not available',
+            'request_id': g.get('request_id', 'unknown')
+        }), 503
+    
+    return jsonify({
+        'success': True,
+        'pool': pool_stats(),
+        'read_replicas': database.ReadSessionLocal.stats() if database.ReadSessionLocal else None,
+        'request_id': g.get('request_id', 'unknown')
+    })
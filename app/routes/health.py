@@ -1,7 +1,9 @@
-from flask import Blueprint, jsonify, g
+from flask import Blueprint, jsonify, g, current_app
 from datetime import datetime
-from ..ml import model
+from .. import database, hashing, ml, ratelimit, write_behind
+from ..ml import prediction_cache
 from ..database import SessionLocal
+from .auth import user_cache
 
 health_bp = Blueprint('health', __name__)
 
@@ -9,13 +11,60 @@ health_bp = Blueprint('health', __name__)
 def health_check():
     """Health check endpoint"""
     db_status = 'connected' if SessionLocal else 'disconnected'
-    model_status = 'loaded' if model else 'not loaded'
+    serving = ml.registry.current
+    model_status = 'loaded' if serving is not None else 'not loaded'
     
     return jsonify({
         'status': 'healthy',
         'environment': 'development',  # Should come from app config
         'model': model_status,
+        'model_version': serving.version if serving is not None else None,
+        'model_artifact': serving.info if serving is not None else None,
         'database': db_status,
+        'read_replicas': database.ReadSessionLocal.stats() if database.ReadSessionLocal else None,
+        'prediction_cache': prediction_cache.stats(),
+        'user_cache': user_cache.stats(),
+        'micro_batching': ml.micro_batcher.stats() if ml.micro_batcher else {'enabled': False},
+        'write_behind': write_behind.writer.stats() if write_behind.writer else {'enabled': False},
+        'rate_limiting': ratelimit.limiter.stats() if ratelimit.limiter else {'enabled': False},
+        'password_hashing': hashing.password_executor.stats() if hashing.password_executor else {'enabled': False},
+        'startup_ms': current_app.extensions['startup_ms'],
         'timestamp': datetime.utcnow().isoformat(),
         'request_id': g.get('request_id', 'unknown')
-    })
\ No newline at end of file
+    })
+
+@health_bp.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving requests, whatever its dependencies"""
+    return jsonify({
+        'status': 'alive',
+        'timestamp': datetime.utcnow().isoformat(),
+        'request_id': g.get('request_id', 'unknown')
+    })
+
+@health_bp.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 only once the model is warm and the database answers"""
+    serving = ml.registry.current
+    checks = {'model': 'ready' if serving is not None else 'loading'}
+    if serving is None and ml.registry.last_swap and ml.registry.last_swap['state'] == 'failed':
+        checks['model'] = 'failed'
+    
+    if database.engine is None:
+        checks['database'] = 'not configured'
+    else:
+        try:
+            database.check_connection()
+            checks['database'] = 'ready'
+        except Exception as e:
+            current_app.logger.warning(f"Readiness check: database unreachable: {str(e)}")
+            checks['database'] = 'unreachable'
+    
+    ready = all(status == 'ready' for status in checks.values())
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'checks': checks,
+        'model_version': serving.version if serving is not None else None,
+        'timestamp': datetime.utcnow().isoformat(),
+        'request_id': g.get('request_id', 'unknown')
+    }), 200 if ready else 503
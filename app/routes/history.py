@@ -1,10 +1,88 @@
-from flask import Blueprint, request, jsonify, g, session
-from sqlalchemy import func
+from flask import Blueprint, request, jsonify, g, session, Response
+from sqlalchemy import func, text, tuple_
+from datetime import datetime
+import base64
+import csv
+import io
+import json
+from .. import database
 from ..database import SessionLocal
+from ..http_cache import make_etag, not_modified_response, set_validators
+from ..rollups import read_scope_version
+from ..utils import read_db_session, reads_from_primary
 from ..models import CarPrediction
 
 history_bp = Blueprint('history', __name__)
 
+# Column projection used by the export instead of hydrating ORM objects
+EXPORT_COLUMNS = list(CarPrediction.__table__.columns)
+EXPORT_FIELDS = [column.name for column in EXPORT_COLUMNS]
+FLAG_FIELDS = {'carbon_fiber_body', 'aero_package', 'limited_edition',
+               'has_warranty', 'non_original_parts', 'damage'}
+EXPORT_CHUNK_SIZE = 1000
+
+# History projection: flags come back as booleans from SQL and datetimes are
+# left to the JSON provider, so rows serialize without ORM objects or to_dict()
+HISTORY_COLUMNS = {
+    column.name: (column != 0).label(column.name) if column.name in FLAG_FIELDS else column
+    for column in EXPORT_COLUMNS
+}
+HISTORY_FIELDS = list(HISTORY_COLUMNS)
+
+def parse_fields(value):
+    """Parse ?fields=a,b,c into known history fields, raising ValueError for unknown names"""
+    if not value:
+        return HISTORY_FIELDS
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in HISTORY_COLUMNS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}" if unknown else 'No fields requested')
+    return fields
+
+def encode_cursor(created_at, prediction_id):
+    """Encode the (created_at, id) position of a row as an opaque cursor"""
+    payload = json.dumps([created_at.isoformat(), prediction_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, prediction_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def apply_history_filters(query):
+    """Apply the current user scope and request filters shared by history endpoints"""
+    # Filter by current user if authenticated
+    user_id = session.get('user_id')
+    if user_id:
+        query = query.filter(CarPrediction.user_id == user_id)
+    
+    # Apply filters if provided
+    if 'brand' in request.args:
+        query = query.filter(CarPrediction.brand.ilike(f"%{request.args['brand']}%"))
+    if 'model' in request.args:
+        query = query.filter(CarPrediction.model.ilike(f"%{request.args['model']}%"))
+    if 'year' in request.args:
+        query = query.filter(CarPrediction.year == request.args['year'])
+    return query
+
+def estimate_count(db_session, query):
+    """Return the planner's row estimate for a query instead of counting rows"""
+    bind = db_session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return query.count()
+    
+    statement = query.with_entities(CarPrediction.id).statement.compile(
+        dialect=bind.dialect, compile_kwargs={'literal_binds': True}
+    )
+    plan = db_session.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
 @history_bp.route('/predictions/history', methods=['GET'])
 def get_prediction_history():
     """Get recent predictions from database"""
@@ -17,44 +95,100 @@ def get_prediction_history():
     try:
         limit = min(request.args.get('limit', 50, type=int), 500)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
+        total_mode = request.args.get('total', 'none')
         
-        db_session = None
-        db_session = SessionLocal()
-        query = db_session.query(CarPrediction)
+        if total_mode not in ('none', 'exact', 'approximate'):
+            return jsonify({
+                'error': 'Invalid total mode',
+                'message': "total must be one of 'none', 'exact' or 'approximate'",
+                'request_id': g.get('request_id', 'unknown')
+            }), 400
         
-        # Filter by current user if authenticated
-        user_id = session.get('user_id')
-        if user_id:
-            query = query.filter(CarPrediction.user_id == user_id)
+        try:
+            position = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid cursor',
+                'message': str(e),
+                'request_id': g.get('request_id', 'unknown')
+            }), 400
         
-        # Apply filters if provided
-        if 'brand' in request.args:
-            query = query.filter(CarPrediction.brand.ilike(f"%{request.args['brand']}%"))
-        if 'model' in request.args:
-            query = query.filter(CarPrediction.model.ilike(f"%{request.args['model']}%"))
-        if 'year' in request.args:
-            query = query.filter(CarPrediction.year == request.args['year'])
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid fields',
+                'message': str(e),
+                'request_id': g.get('request_id', 'unknown')
+            }), 400
         
-        # Get total count
-        total = query.count()
+        shape = request.args.get('shape', 'objects')
+        if shape not in ('objects', 'rows'):
+            return jsonify({
+                'error': 'Invalid shape',
+                'message': "shape must be 'objects' or 'rows'",
+                'request_id': g.get('request_id', 'unknown')
+            }), 400
         
-        # Get paginated results
-        predictions = query.order_by(CarPrediction.created_at.desc())\
-                         .offset(offset)\
-                         .limit(limit)\
-                         .all()
+        db_session = read_db_session()
+        
+        # Polling clients get a 304 before the page and count queries run
+        etag = make_etag('history', read_scope_version(db_session, session.get('user_id')),
+                         request.query_string)
+        not_modified = not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+        
+        # created_at and id always trail the projection for the cursor
+        query = apply_history_filters(db_session.query(
+            *(HISTORY_COLUMNS[field] for field in fields), CarPrediction.created_at, CarPrediction.id
+        ))
+        
+        # Totals cost a scan of every matching row, so they are opt-in
+        total = None
+        if total_mode == 'exact':
+            total = query.count()
+        elif total_mode == 'approximate':
+            total = estimate_count(db_session, query)
+        
+        # Seek past the cursor instead of skipping rows with OFFSET
+        page_query = query.order_by(CarPrediction.created_at.desc(), CarPrediction.id.desc())
+        if position:
+            page_query = page_query.filter(
+                tuple_(CarPrediction.created_at, CarPrediction.id) < tuple_(*position)
+            )
+        elif offset:
+            page_query = page_query.offset(offset)
+        
+        # Fetch one extra row to learn whether another page exists
+        rows = page_query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        next_cursor = None
+        if has_more and rows and rows[-1][-2]:
+            next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
         
         result = {
             'success': True,
-            'count': len(predictions),
+            'count': len(rows),
             'total': total,
-            'offset': offset,
+            'total_mode': total_mode,
+            'offset': offset if not position else None,
             'limit': limit,
-            'predictions': [pred.to_dict() for pred in predictions],
+            'has_more': has_more,
+            'next_cursor': next_cursor,
             'request_id': g.get('request_id', 'unknown')
         }
+        if shape == 'rows':
+            # Column tuples go straight to the encoder; field names are sent once
+            result['fields'] = fields
+            result['rows'] = [row[:len(fields)] for row in rows]
+        else:
+            result['predictions'] = [dict(zip(fields, row)) for row in rows]
         
-        return jsonify(result)
+        return set_validators(jsonify(result), etag)
         
     except Exception as e:
         return jsonify({
@@ -62,6 +196,85 @@ def get_prediction_history():
             'message': str(e),
             'request_id': g.get('request_id', 'unknown')
         }), 500
-    finally:
-        if db_session:
-            db_session.close()
\ No newline at end of file
+
+def export_row(row):
+    """Convert a projected row to the same field values as CarPrediction.to_dict()"""
+    values = row._asdict()
+    for field in FLAG_FIELDS:
+        values[field] = bool(values[field])
+    if values['created_at'] is not None:
+        values['created_at'] = values['created_at'].isoformat()
+    return values
+
+def generate_ndjson(rows):
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(export_row(row), separators=(',', ':')))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+def generate_csv(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(export_row(row).values())
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    yield output.getvalue()
+
+@history_bp.route('/predictions/export', methods=['GET'])
+def export_predictions():
+    """Stream predictions as NDJSON or CSV using a server-side cursor"""
+    if SessionLocal is None:
+        return jsonify({
+            'error': 'Database not available',
+            'request_id': g.get('request_id', 'unknown')
+        }), 503
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({
+            'error': 'Invalid format',
+            'message': "format must be 'ndjson' or 'csv'",
+            'request_id': g.get('request_id', 'unknown')
+        }), 400
+    
+    # Not the request-scoped session: streaming continues after the request
+    # context is torn down, so the generator owns and closes this one
+    db_session = database.ReadSessionLocal(use_primary=reads_from_primary())
+    try:
+        query = apply_history_filters(db_session.query(*EXPORT_COLUMNS))\
+            .order_by(CarPrediction.created_at.desc(), CarPrediction.id.desc())\
+            .execution_options(stream_results=True)\
+            .yield_per(EXPORT_CHUNK_SIZE)
+        if 'limit' in request.args:
+            query = query.limit(request.args.get('limit', type=int))
+    except Exception as e:
+        db_session.close()
+        return jsonify({
+            'error': 'Failed to export predictions',
+            'message': str(e),
+            'request_id': g.get('request_id', 'unknown')
+        }), 500
+    
+    def generate():
+        # The session must outlive the view; it closes when streaming ends
+        try:
+            rows = iter(query)
+            if export_format == 'csv':
+                yield from generate_csv(rows)
+            else:
+                yield from generate_ndjson(rows)
+        finally:
+            db_session.close()
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(generate(), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=predictions.{export_format}'
+    })
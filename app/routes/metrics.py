@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from ..metrics import CONTENT_TYPE, metrics_text
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of this process's metrics"""
+    return Response(metrics_text(), mimetype=None, content_type=CONTENT_TYPE)
@@ -0,0 +1,52 @@
+from flask import Blueprint, jsonify, g, request, current_app
+from .. import ml
+from ..utils import admin_token_valid
+
+model_admin_bp = Blueprint('model_admin', __name__)
+
+@model_admin_bp.route('/model', methods=['GET'])
+def get_model_status():
+    """Report the serving model version and the state of the last swap"""
+    serving = ml.registry.current
+    return jsonify({
+        'success': True,
+        'model': ml.registry.stats(),
+        'model_artifact': serving.info if serving is not None else None,
+        'request_id': g.get('request_id', 'unknown')
+    })
+
+@model_admin_bp.route('/model/reload', methods=['POST'])
+def reload_model():
+    """Load, warm and swap in the model currently at MODEL_PATH"""
+    if not admin_token_valid():
+        return jsonify({
+            'error': 'Forbidden',
+            'message': 'A valid X-Admin-Token header is required (MODEL_ADMIN_TOKEN must be set)',
+            'request_id': g.get('request_id', 'unknown')
+        }), 403
+    
+    # ?wait=true blocks until the new model is serving (or failed to load)
+    wait = request.args.get('wait', 'false').lower() in ('1', 'true', 'yes')
+    if not ml.registry.swap(current_app.config['MODEL_PATH'], background=not wait):
+        return jsonify({
+            'error': 'Model swap in progress',
+            'message': 'Another model is still loading; retry once it finishes',
+            'error_code': 'MODEL_SWAP_IN_PROGRESS',
+            'status': ml.registry.last_swap,
+            'request_id': g.get('request_id', 'unknown')
+        }), 409
+    
+    status = ml.registry.last_swap
+    if wait and status['state'] == 'failed':
+        return jsonify({
+            'error': 'Model swap failed',
+            'message': status.get('error'),
+            'status': status,
+            'request_id': g.get('request_id', 'unknown')
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'status': status,
+        'request_id': g.get('request_id', 'unknown')
+    }), 200 if wait else 202
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify, g, session
+from flask import Blueprint, request, jsonify, g, session, current_app
 import logging
-from ..ml import model, predict_price
-from ..utils import get_client_ip, save_prediction_to_db
+import math
+from .. import ml
+from ..ml import predict_price, predict_prices, sweep_prices, get_missing_fields, validate_record, SWEEP_FEATURES
+from ..profiling import timed_phase
+from ..utils import get_client_ip, save_prediction_to_db, save_predictions_to_db, enqueue_predictions, mark_recent_write
 from datetime import datetime
 
 predict_bp = Blueprint('predict', __name__)
@@ -9,7 +12,9 @@ predict_bp = Blueprint('predict', __name__)
 @predict_bp.route('/predict', methods=['POST'])
 def predict_car_price():
     """Main prediction endpoint"""
-    if model is None:
+    # In-flight requests finish on this version even if a swap lands meanwhile
+    serving = ml.registry.current
+    if serving is None:
         return jsonify({
             'error': 'Model not loaded',
             'message': 'Service temporarily unavailable',
@@ -24,11 +29,12 @@ def predict_car_price():
         }), 400
     
     try:
-        data = request.get_json()
+        with timed_phase('parse'):
+            data = request.get_json()
         
         # Validate required fields
-        required_fields = ['brand', 'model', 'year']
-        missing_fields = [field for field in required_fields if field not in data]
+        with timed_phase('validate'):
+            missing_fields = get_missing_fields(data)
         
         if missing_fields:
             return jsonify({
@@ -38,22 +44,35 @@ def predict_car_price():
             }), 400
         
         # Make prediction
-        predicted_price = predict_price(data)
+        with timed_phase('predict'):
+            predicted_price = predict_price(data, serving)
         
         # Save to database
         user_ip = get_client_ip()
         user_id = session.get('user_id')  # Get current user ID from session
-        db_id = save_prediction_to_db(data, predicted_price, user_ip, user_id)
+        db_id = None
+        with timed_phase('db'):
+            queued = not enqueue_predictions([(data, predicted_price)], user_ip, user_id)
+            if not queued:
+                db_id = save_prediction_to_db(data, predicted_price, user_ip, user_id)
+        # Commits pin reads to the primary themselves; queued rows commit after the response
+        mark_recent_write()
         
         response = {
             'success': True,
             'predicted_price': predicted_price,
             'currency': 'USD',
+            'model_version': serving.version,
             'database_id': db_id,
-            'input_data': data,
+            'queued': queued,
             'request_id': g.get('request_id', 'unknown'),
             'timestamp': datetime.utcnow().isoformat()
         }
+        
+        # Echoing the input can be switched off per request with ?include_input=false
+        include_input = request.args.get('include_input', str(current_app.config['PREDICT_INCLUDE_INPUT']))
+        if include_input.lower() in ('1', 'true', 'yes'):
+            response['input_data'] = data
 
         return jsonify(response)
         
@@ -69,4 +88,258 @@ def predict_car_price():
             'error': 'Prediction failed',
             'message': str(e),
             'request_id': g.get('request_id', 'unknown')
-        }), 500
\ No newline at end of file
+        }), 500
+
+@predict_bp.route('/predict/batch', methods=['POST'])
+def predict_car_prices_batch():
+    """Batch prediction endpoint scoring many cars with one model call"""
+    serving = ml.registry.current
+    if serving is None:
+        return jsonify({
+            'error': 'Model not loaded',
+            'message': 'Service temporarily unavailable',
+            'request_id': g.get('request_id', 'unknown')
+        }), 503
+    
+    if not request.is_json:
+        return jsonify({
+            'error': 'Invalid request',
+            'message': 'Request must be JSON',
+            'request_id': g.get('request_id', 'unknown')
+        }), 400
+    
+    try:
+        with timed_phase('parse'):
+            data = request.get_json()
+        cars = data.get('cars') if isinstance(data, dict) else data
+        
+        if not isinstance(cars, list) or not cars:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Request must contain a non-empty list of cars',
+                'request_id': g.get('request_id', 'unknown')
+            }), 400
+        
+        max_batch_size = current_app.config['MAX_BATCH_SIZE']
+        if len(cars) > max_batch_size:
+            return jsonify({
+                'error': 'Batch too large',
+                'message': f'A batch may contain at most {max_batch_size} cars',
+                'request_id': g.get('request_id', 'unknown')
+            }), 413
+        
+        # Validate every row up front so one bad record doesn't fail the batch
+        results = [None] * len(cars)
+        valid_indices = []
+        for index, car in enumerate(cars):
+            if not isinstance(car, dict):
+                results[index] = {
+                    'index': index,
+                    'success': False,
+                    'error': 'Invalid data format',
+                    'message': 'Each car must be a JSON object'
+                }
+                continue
+            
+            missing_fields = get_missing_fields(car)
+            if missing_fields:
+                results[index] = {
+                    'index': index,
+                    'success': False,
+                    'error': 'Missing required fields',
+                    'missing_fields': missing_fields
+                }
+                continue
+            
+            # Values the model would reject or the multi-row insert would fail on
+            try:
+                validate_record(car)
+            except ValueError as e:
+                results[index] = {
+                    'index': index,
+                    'success': False,
+                    'error': 'Invalid data format',
+                    'message': str(e)
+                }
+                continue
+            
+            valid_indices.append(index)
+        
+        # Make predictions for all valid rows at once
+        valid_cars = [cars[index] for index in valid_indices]
+        with timed_phase('predict'):
+            predicted_prices = predict_prices(valid_cars, serving)
+        
+        for index, predicted_price in zip(valid_indices, predicted_prices):
+            results[index] = {
+                'index': index,
+                'success': True,
+                'predicted_price': predicted_price
+            }
+        
+        # Save to database
+        user_ip = get_client_ip()
+        user_id = session.get('user_id')  # Get current user ID from session
+        items = list(zip(valid_cars, predicted_prices))
+        with timed_phase('db'):
+            unqueued = enqueue_predictions(items, user_ip, user_id)
+            saved_count = save_predictions_to_db(unqueued, user_ip, user_id)
+        # Commits pin reads to the primary themselves; queued rows commit after the response
+        mark_recent_write()
+        queued_count = len(items) - len(unqueued)
+        
+        response = {
+            'success': True,
+            'count': len(cars),
+            'predicted_count': len(valid_indices),
+            'error_count': len(cars) - len(valid_indices),
+            'saved_count': saved_count,
+            'queued_count': queued_count,
+            'currency': 'USD',
+            'model_version': serving.version,
+            'results': results,
+            'request_id': g.get('request_id', 'unknown'),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+        return jsonify(response)
+        
+    except ValueError as e:
+        return jsonify({
+            'error': 'Invalid data format',
+            'message': str(e),
+            'request_id': g.get('request_id', 'unknown')
+        }), 400
+    except Exception as e:
+        logging.error(f"Batch prediction error: {str(e)}")
+        return jsonify({
+            'error': 'Batch prediction failed',
+            'message': str(e),
+            'request_id': g.get('request_id', 'unknown')
+        }), 500
+
+class SweepTooLarge(ValueError):
+    """Raised when a sweep grid would exceed SWEEP_MAX_POINTS"""
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def parse_sweep_axis(spec, max_points):
+    """Turn one entry of the request's 'vary' list into (feature, values)
+
+    Entries give either explicit 'values' or an inclusive 'start'/'stop'/'step'
+    range; ranges are sized before they are materialized.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Each 'vary' entry must be a JSON object")
+    
+    feature = spec.get('feature')
+    if feature not in SWEEP_FEATURES:
+        raise ValueError(f"Cannot sweep {feature!r}; choose one of: {', '.join(SWEEP_FEATURES)}")
+    
+    if 'values' in spec:
+        values = spec['values']
+        if not isinstance(values, list) or not values or not all(_is_number(value) for value in values):
+            raise ValueError(f"'values' for {feature} must be a non-empty list of numbers")
+        if len(values) > max_points:
+            raise SweepTooLarge(f"{feature} has {len(values)} values")
+    else:
+        start, stop, step = (spec.get(key) for key in ('start', 'stop', 'step'))
+        if not all(_is_number(value) for value in (start, stop, step)):
+            raise ValueError(f"Sweep of {feature} needs 'values' or numeric 'start', 'stop' and 'step'")
+        if step == 0 or (stop - start) / step < 0:
+            raise ValueError(f"'step' for {feature} must be non-zero and move from 'start' towards 'stop'")
+        # Compared before flooring: a tiny step across a wide range overflows to inf
+        span = (stop - start) / step
+        if not math.isfinite(span) or span >= max_points:
+            raise SweepTooLarge(f"{feature} spans more than {max_points} values")
+        count = math.floor(span + 1e-9) + 1
+        if count > max_points:
+            raise SweepTooLarge(f"{feature} spans {count} values")
+        values = [round(start + step * i, 10) for i in range(count)]
+    
+    if feature in ml.INT_COLUMNS:
+        values = [math.trunc(value) for value in values]
+    return feature, values
+
+@predict_bp.route('/predict/sweep', methods=['POST'])
+def predict_price_sweep():
+    """Price a car over a grid of one or two varied features with one model call"""
+    serving = ml.registry.current
+    if serving is None:
+        return jsonify({
+            'error': 'Model not loaded',
+            'message': 'Service temporarily unavailable',
+            'request_id': g.get('request_id', 'unknown')
+        }), 503
+    
+    if not request.is_json:
+        return jsonify({
+            'error': 'Invalid request',
+            'message': 'Request must be JSON',
+            'request_id': g.get('request_id', 'unknown')
+        }), 400
+    
+    max_points = current_app.config['SWEEP_MAX_POINTS']
+    try:
+        with timed_phase('parse'):
+            data = request.get_json()
+        
+        with timed_phase('validate'):
+            car = data.get('car') if isinstance(data, dict) else None
+            vary = data.get('vary') if isinstance(data, dict) else None
+            if not isinstance(car, dict) or not isinstance(vary, list) or not 1 <= len(vary) <= 2:
+                return jsonify({
+                    'error': 'Invalid request',
+                    'message': "Request must contain a 'car' object and a 'vary' list of one or two features",
+                    'request_id': g.get('request_id', 'unknown')
+                }), 400
+            
+            missing_fields = get_missing_fields(car)
+            if missing_fields:
+                return jsonify({
+                    'error': 'Missing required fields',
+                    'missing_fields': missing_fields,
+                    'request_id': g.get('request_id', 'unknown')
+                }), 400
+            
+            axes = [parse_sweep_axis(spec, max_points) for spec in vary]
+            if len(axes) == 2 and axes[0][0] == axes[1][0]:
+                raise ValueError("The two swept features must be different")
+            points = math.prod(len(values) for _, values in axes)
+            if points > max_points:
+                raise SweepTooLarge(f"the grid has {points} points")
+        
+        with timed_phase('predict'):
+            prices = sweep_prices(car, axes, serving)
+        
+        return jsonify({
+            'success': True,
+            'axes': [{'feature': feature, 'values': values} for feature, values in axes],
+            'prices': prices.tolist(),
+            'points': points,
+            'currency': 'USD',
+            'model_version': serving.version,
+            'request_id': g.get('request_id', 'unknown'),
+            'timestamp': datetime.utcnow().isoformat()
+        })
+        
+    except SweepTooLarge as e:
+        return jsonify({
+            'error': 'Sweep too large',
+            'message': f'A sweep may contain at most {max_points} points; {str(e)}',
+            'request_id': g.get('request_id', 'unknown')
+        }), 413
+    except ValueError as e:
+        return jsonify({
+            'error': 'Invalid data format',
+            'message': str(e),
+            'request_id': g.get('request_id', 'unknown')
+        }), 400
+    except Exception as e:
+        logging.error(f"Sweep prediction error: {str(e)}")
+        return jsonify({
+            'error': 'Sweep prediction failed',
+            'message': str(e),
+            'request_id': g.get('request_id', 'unknown')
+        }), 500
@@ -1,8 +1,9 @@
-from flask import Blueprint, jsonify, g, session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from flask import Blueprint, jsonify, g, session, current_app
+import time
 from ..database import SessionLocal
-from ..models import CarPrediction
+from ..http_cache import make_etag, not_modified_response, set_validators
+from ..rollups import read_prediction_stats, read_scope_version
+from ..utils import read_db_session
 
 stats_bp = Blueprint('stats', __name__)
 
@@ -16,52 +17,26 @@ def get_prediction_stats():
         }), 503
     
     try:
-        db_session = None
-        db_session = SessionLocal()
+        db_session = read_db_session()
         
-        # Filter by current user if authenticated
+        # Answer polling clients from the validator before touching the rollups;
+        # the 24h count drifts as rows age out, so the tag also rolls over
+        # every STATS_ETAG_TTL seconds
         user_id = session.get('user_id')
-        base_query = db_session.query(CarPrediction)
-        if user_id:
-            base_query = base_query.filter(CarPrediction.user_id == user_id)
+        etag = make_etag('stats', read_scope_version(db_session, user_id),
+                         int(time.time() // current_app.config['STATS_ETAG_TTL']))
+        not_modified = not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
         
-        # Basic stats
-        stats = base_query.with_entities(
-            func.count(CarPrediction.id).label('total_predictions'),
-            func.avg(CarPrediction.predicted_price).label('avg_price'),
-            func.max(CarPrediction.predicted_price).label('max_price'),
-            func.min(CarPrediction.predicted_price).label('min_price'),
-            func.stddev(CarPrediction.predicted_price).label('price_stddev')
-        ).first()
+        # Read pre-aggregated rollups for the current user, or all users
+        result = read_prediction_stats(db_session, user_id)
+        result['request_id'] = g.get('request_id', 'unknown')
         
-        # Popular brands
-        popular_brands = base_query.with_entities(
-            CarPrediction.brand,
-            func.count(CarPrediction.id).label('count')
-        ).group_by(CarPrediction.brand)\
-         .order_by(func.count(CarPrediction.id).desc())\
-         .limit(5)\
-         .all()
-        
-        # Recent activity
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_count = base_query.filter(CarPrediction.created_at >= yesterday).count()
-        
-        result = {
-            'total_predictions': stats.total_predictions or 0,
-            'average_price': float(stats.avg_price or 0),
-            'maximum_price': float(stats.max_price or 0),
-            'minimum_price': float(stats.min_price or 0),
-            'price_standard_deviation': float(stats.price_stddev or 0),
-            'popular_brands': [{'brand': b.brand, 'count': b.count} for b in popular_brands],
-            'recent_predictions_24h': recent_count,
-            'request_id': g.get('request_id', 'unknown')
-        }
-        
-        return jsonify({
+        return set_validators(jsonify({
             'success': True,
             'stats': result
-        })
+        }), etag)
         
     except Exception as e:
         return jsonify({
@@ -69,6 +44,3 @@ def get_prediction_stats():
             'message': str(e),
             'request_id': g.get('request_id', 'unknown')
         }), 500
-    finally:
-        if db_session:
-            db_session.close()
\ No newline at end of file
@@ -1,9 +1,15 @@
-from flask import request, g
+from flask import request, g, current_app, session as flask_session
+import hmac
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
 from app.models import CarPrediction
 from app.database import SessionLocal
+from app.rollups import update_rollups
+from app import database, write_behind
+from app.metrics import SAVE_PREDICTION_STAGE, INSERT_ROWS_STAGE
 
 def get_client_ip():
     """Get client IP address considering proxy headers"""
@@ -12,55 +18,131 @@ def get_client_ip():
     else:
         return request.environ['HTTP_X_FORWARDED_FOR'].split(',')[0]
 
+def admin_token_valid():
+    """X-Admin-Token must match MODEL_ADMIN_TOKEN; admin endpoints stay closed while it is unset"""
+    token = current_app.config['MODEL_ADMIN_TOKEN']
+    return bool(token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+def mark_recent_write():
+    """Pin this client's reads to the primary for READ_YOUR_WRITES_SECONDS"""
+    if database.ReadSessionLocal is not None and database.ReadSessionLocal.replicas:
+        flask_session['last_write_at'] = time.time()
+
+def reads_from_primary():
+    """True while this client is inside its read-your-writes window"""
+    last_write = flask_session.get('last_write_at')
+    return last_write is not None and \
+        time.time() - last_write < current_app.config['READ_YOUR_WRITES_SECONDS']
+
+def read_db_session():
+    """Request-scoped session for read-only endpoints: a replica, unless this client wrote recently"""
+    return database.get_request_read_session(use_primary=reads_from_primary())
+
+def build_prediction_record(car_data: Dict, predicted_price: float, user_ip: str = None, user_id: int = None) -> Dict:
+    """Build the column values for a CarPrediction row"""
+    return dict(
+        year=car_data.get('year', 2020),
+        brand=car_data.get('brand', 'unknown'),
+        model=car_data.get('model', 'unknown'),
+        color=car_data.get('color', 'unknown'),
+        engine_config=car_data.get('engine_config', 'unknown'),
+        horsepower=car_data.get('horsepower', 0),
+        torque=car_data.get('torque', 0),
+        weight_kg=car_data.get('weight_kg', 0),
+        zero_to_60_s=car_data.get('zero_to_60_s', 0.0),
+        top_speed_mph=car_data.get('top_speed_mph', 0),
+        num_doors=car_data.get('num_doors', 2),
+        transmission=car_data.get('transmission', 'unknown'),
+        drivetrain=car_data.get('drivetrain', 'unknown'),
+        market_region=car_data.get('market_region', 'unknown'),
+        mileage=car_data.get('mileage', 0),
+        num_owners=car_data.get('num_owners', 0),
+        interior_material=car_data.get('interior_material', 'unknown'),
+        brake_type=car_data.get('brake_type', 'unknown'),
+        tire_brand=car_data.get('tire_brand', 'unknown'),
+        last_service_date=car_data.get('last_service_date', ''),
+        service_history=car_data.get('service_history', 'unknown'),
+        warranty_years=car_data.get('warranty_years', 0),
+        damage_cost=car_data.get('damage_cost', 0.0),
+        damage_type=car_data.get('damage_type', 'none'),
+        carbon_fiber_body=int(car_data.get('carbon_fiber_body', 0)),
+        aero_package=int(car_data.get('aero_package', 0)),
+        limited_edition=int(car_data.get('limited_edition', 0)),
+        has_warranty=int(car_data.get('has_warranty', 0)),
+        non_original_parts=int(car_data.get('non_original_parts', 0)),
+        damage=int(car_data.get('damage', 0)),
+        predicted_price=predicted_price,
+        user_ip=user_ip,
+        user_id=user_id,  # Link to user who made the prediction
+        session_id=str(uuid.uuid4()),
+        request_id=g.get('request_id', str(uuid.uuid4())),
+        created_at=datetime.utcnow()
+    )
+
 def save_prediction_to_db(car_data: Dict, predicted_price: float, user_ip: str = None, user_id: int = None) -> Optional[int]:
     """Save car prediction data to database"""
     if SessionLocal is None:
         return None
     
-    session = SessionLocal()
+    start = time.perf_counter()
+    record = build_prediction_record(car_data, predicted_price, user_ip, user_id)
+    session = database.get_request_session()
     try:
-        prediction = CarPrediction(
-            year=car_data.get('year', 2020),
-            brand=car_data.get('brand', 'unknown'),
-            model=car_data.get('model', 'unknown'),
-            color=car_data.get('color', 'unknown'),
-            engine_config=car_data.get('engine_config', 'unknown'),
-            horsepower=car_data.get('horsepower', 0),
-            torque=car_data.get('torque', 0),
-            weight_kg=car_data.get('weight_kg', 0),
-            zero_to_60_s=car_data.get('zero_to_60_s', 0.0),
-            top_speed_mph=car_data.get('top_speed_mph', 0),
-            num_doors=car_data.get('num_doors', 2),
-            transmission=car_data.get('transmission', 'unknown'),
-            drivetrain=car_data.get('drivetrain', 'unknown'),
-            market_region=car_data.get('market_region', 'unknown'),
-            mileage=car_data.get('mileage', 0),
-            num_owners=car_data.get('num_owners', 0),
-            interior_material=car_data.get('interior_material', 'unknown'),
-            brake_type=car_data.get('brake_type', 'unknown'),
-            tire_brand=car_data.get('tire_brand', 'unknown'),
-            last_service_date=car_data.get('last_service_date', ''),
-            service_history=car_data.get('service_history', 'unknown'),
-            warranty_years=car_data.get('warranty_years', 0),
-            damage_cost=car_data.get('damage_cost', 0.0),
-            damage_type=car_data.get('damage_type', 'none'),
-            carbon_fiber_body=int(car_data.get('carbon_fiber_body', 0)),
-            aero_package=int(car_data.get('aero_package', 0)),
-            limited_edition=int(car_data.get('limited_edition', 0)),
-            has_warranty=int(car_data.get('has_warranty', 0)),
-            non_original_parts=int(car_data.get('non_original_parts', 0)),
-            damage=int(car_data.get('damage', 0)),
-            predicted_price=predicted_price,
-            user_ip=user_ip,
-            user_id=user_id,  # Link to user who made the prediction
-            session_id=str(uuid.uuid4()),
-            request_id=g.get('request_id', str(uuid.uuid4()))
-        )
+        prediction = CarPrediction(**record)
         session.add(prediction)
+        update_rollups(session, [record])
         session.commit()
         return prediction.id
     except Exception as e:
         session.rollback()
         raise
     finally:
-        session.close()
\ No newline at end of file
+        SAVE_PREDICTION_STAGE.observe(time.perf_counter() - start)
+
+def insert_prediction_rows(rows: List[Dict], session=None) -> int:
+    """Insert prepared CarPrediction rows with a single multi-row insert
+
+    Uses the given session, or a private one that is closed afterwards (the
+    write-behind thread has no request to borrow a session from).
+    """
+    if SessionLocal is None or not rows:
+        return 0
+    
+    start = time.perf_counter()
+    owns_session = session is None
+    if owns_session:
+        session = SessionLocal()
+    try:
+        session.execute(insert(CarPrediction), rows)
+        update_rollups(session, rows)
+        session.commit()
+        return len(rows)
+    except Exception as e:
+        session.rollback()
+        raise
+    finally:
+        if owns_session:
+            session.close()
+        INSERT_ROWS_STAGE.observe(time.perf_counter() - start)
+
+def save_predictions_to_db(items: List[Tuple[Dict, float]], user_ip: str = None, user_id: int = None) -> int:
+    """Save many (car_data, predicted_price) pairs with a single multi-row insert"""
+    if SessionLocal is None:
+        return 0
+
+    rows = [build_prediction_record(car_data, price, user_ip, user_id) for car_data, price in items]
+    if not rows:
+        return 0
+    return insert_prediction_rows(rows, database.get_request_session())
+
+def enqueue_predictions(items: List[Tuple[Dict, float]], user_ip: str = None, user_id: int = None) -> List[Tuple[Dict, float]]:
+    """Hand predictions to the write-behind queue, returning the ones it could not take"""
+    writer = write_behind.writer
+    if writer is None or SessionLocal is None:
+        return list(items)
+    
+    rejected = []
+    for car_data, price in items:
+        if not writer.enqueue(build_prediction_record(car_data, price, user_ip, user_id)):
+            rejected.append((car_data, price))
+    return rejected
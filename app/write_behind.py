@@ -0,0 +1,177 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+writer = None
+
+class WriteBehindWriter:
+    """Persist prediction rows from a bounded in-memory queue on a background thread
+
+    Rows are flushed with a single multi-row insert once ``batch_size`` rows are
+    waiting or ``flush_interval`` seconds have passed. ``enqueue`` blocks for at
+    most ``enqueue_timeout`` seconds when the queue is full and then reports
+    failure so the caller can fall back to a synchronous write. A batch that
+    still fails after ``max_retries`` attempts is split until the failing rows
+    are isolated; only those are dropped.
+    """
+
+    def __init__(self, flush_fn, max_queue_size=10000, batch_size=200,
+                 flush_interval=0.5, enqueue_timeout=0.05, max_retries=3):
+        self.flush_fn = flush_fn
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.dropped_rows = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self, timeout=10.0):
+        """Flush everything still queued and stop the background thread"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+        self._thread = None
+        if not self._queue.empty():
+            logging.error(f"Write-behind queue shut down with {self._queue.qsize()} unsaved predictions")
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def enqueue(self, row):
+        """Queue a row for insertion; False means the queue is full or stopped"""
+        if not self.running:
+            return False
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def stats(self):
+        """Return queue and flush counters"""
+        return {
+            'enabled': self.running,
+            'queue_depth': self._queue.qsize(),
+            'max_queue_size': self._queue.maxsize,
+            'batch_size': self.batch_size,
+            'flush_interval_ms': round(self.flush_interval * 1000, 3),
+            'enqueued': self.enqueued,
+            'rejected': self.rejected,
+            'flushes': self.flushes,
+            'flushed_rows': self.flushed_rows,
+            'failed_flushes': self.failed_flushes,
+            'dropped_rows': self.dropped_rows
+        }
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            if self._stop.is_set() and self._queue.empty():
+                return
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0 and not self._stop.is_set():
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        """Insert batch, retrying transient failures; a batch that keeps failing
+        is bisected so only the rows the database rejects are dropped"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self._insert(batch)
+                return
+            except Exception as e:
+                error = e
+                self.failed_flushes += 1
+                logging.error(f"Write-behind flush of {len(batch)} rows failed (attempt {attempt}): {str(e)}")
+                if attempt < self.max_retries:
+                    time.sleep(0.1 * attempt)
+
+        if len(batch) == 1:
+            self._drop(batch[0], error)
+        else:
+            self._bisect(batch)
+
+    def _insert(self, rows):
+        self.flush_fn(rows)
+        self.flushes += 1
+        self.flushed_rows += len(rows)
+
+    def _bisect(self, rows):
+        middle = len(rows) // 2
+        for half in (rows[:middle], rows[middle:]):
+            try:
+                self._insert(half)
+            except Exception as e:
+                self.failed_flushes += 1
+                if len(half) > 1:
+                    self._bisect(half)
+                else:
+                    self._drop(half[0], e)
+
+    def _drop(self, row, error):
+        self.dropped_rows += 1
+        # session_id is unique per row; request_id comes from the client's X-Request-ID and may repeat
+        logging.error(f"Dropped prediction {row.get('session_id')} (request {row.get('request_id')}): {str(error)}")
+
+def init_write_behind(app):
+    """(Re)start the write-behind writer if enabled in the config"""
+    global writer
+    from .utils import insert_prediction_rows
+
+    shutdown_write_behind()
+    if not app.config['WRITE_BEHIND_ENABLED']:
+        return None
+
+    writer = WriteBehindWriter(
+        insert_prediction_rows,
+        max_queue_size=app.config['WRITE_BEHIND_QUEUE_SIZE'],
+        batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+        flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL_MS'] / 1000.0,
+        enqueue_timeout=app.config['WRITE_BEHIND_ENQUEUE_TIMEOUT_MS'] / 1000.0
+    ).start()
+    app.logger.info("Write-behind persistence enabled")
+    return writer
+
+def shutdown_write_behind():
+    """Flush and stop the writer, if one is running"""
+    global writer
+    if writer is not None:
+        writer.shutdown()
+        writer = None
+
+atexit.register(shutdown_write_behind)
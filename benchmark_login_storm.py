@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Login storm benchmark for the password hashing pool
+
+Measures /predict latency while a burst of /auth/login requests runs in the
+same process, once with hashing on the request threads
+(PASSWORD_HASH_WORKERS=0) and once with the bounded hashing pool. Uses a
+throwaway SQLite database, so no PostgreSQL is needed.
+
+    python benchmark_login_storm.py --duration 10 --login-threads 16
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from config import Config
+
+SAMPLE_CAR = {
+    'brand': 'Ferrari',
+    'model': 'F8 Tributo',
+    'year': 2021,
+    'horsepower': 710,
+    'torque': 568,
+    'weight_kg': 1435,
+    'mileage': 5000
+}
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def build_app(db_path, hash_workers):
+    from app import create_app
+
+    class BenchmarkConfig(Config):
+        DATABASE_URL = f'sqlite:///{db_path}'
+        DB_CREATE_SCHEMA = True
+        PASSWORD_HASH_WORKERS = hash_workers
+        WRITE_BEHIND_ENABLED = False
+        MICROBATCH_ENABLED = False
+        RATE_LIMIT_ENABLED = False
+
+    return create_app(BenchmarkConfig)
+
+def predict_loop(app, stop, latencies):
+    client = app.test_client()
+    while not stop.is_set():
+        # Vary mileage so every request misses the prediction cache
+        car = dict(SAMPLE_CAR, mileage=random.randint(0, 100000))
+        start = time.perf_counter()
+        client.post('/predict', json=car)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+def login_loop(app, stop, outcomes):
+    client = app.test_client()
+    while not stop.is_set():
+        response = client.post('/auth/login', json={'username': 'storm_user', 'password': 'storm-password'})
+        outcomes.append(response.status_code)
+
+def run_phase(app, duration, predict_threads, login_threads):
+    stop = threading.Event()
+    latencies = []
+    outcomes = []
+    threads = [threading.Thread(target=predict_loop, args=(app, stop, latencies)) for _ in range(predict_threads)]
+    threads += [threading.Thread(target=login_loop, args=(app, stop, outcomes)) for _ in range(login_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, outcomes
+
+def report(label, latencies, outcomes):
+    rejected = sum(1 for status in outcomes if status == 503)
+    print(f"{label:38} predictions={len(latencies):6}  p50={percentile(latencies, 50):7.2f}ms  "
+          f"p99={percentile(latencies, 99):7.2f}ms  logins={len(outcomes) - rejected:5}  rejected={rejected}")
+
+def benchmark(duration, predict_threads, login_threads, hash_workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, workers in (('inline hashing', 0), (f'hashing pool ({hash_workers} workers)', hash_workers)):
+            app = build_app(os.path.join(tmp, f'bench_{workers}.db'), workers)
+            app.test_client().post('/auth/register', json={
+                'username': 'storm_user',
+                'email': 'storm@example.com',
+                'password': 'storm-password'
+            })
+
+            latencies, _ = run_phase(app, duration, predict_threads, 0)
+            report(f'{label}, no logins', latencies, [])
+            latencies, outcomes = run_phase(app, duration, predict_threads, login_threads)
+            report(f'{label}, login storm', latencies, outcomes)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure /predict latency during a login storm')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per phase')
+    parser.add_argument('--predict-threads', type=int, default=4)
+    parser.add_argument('--login-threads', type=int, default=4 * (os.cpu_count() or 1))
+    parser.add_argument('--hash-workers', type=int, default=Config.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+    benchmark(args.duration, args.predict_threads, args.login_threads, args.hash_workers)
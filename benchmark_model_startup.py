@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Model startup benchmark: plain pickle vs memory-mapped artifact
+
+Loads each model format in fresh interpreter processes (as a new worker
+would) and reports the model load time, the whole process wall time, and
+how many NumPy arrays ended up memory-mapped rather than copied.
+
+    python export_model.py supercar_price_prediction_model.pkl models/supercar
+    python benchmark_model_startup.py --artifact models/supercar --runs 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from config import Config
+
+# Runs in each child; imports are timed separately from the load itself
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import numpy as np
+from app import ml
+imported = time.perf_counter()
+serving = ml.load_model(sys.argv[1], use_compiled_encoder=False, verify=sys.argv[2] == 'verify')
+loaded = time.perf_counter()
+
+def count_arrays(obj, seen):
+    if id(obj) in seen:
+        return 0, 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return 1, int(isinstance(obj, np.memmap) or isinstance(obj.base, np.memmap))
+    children = obj.values() if isinstance(obj, dict) else obj if isinstance(obj, (list, tuple)) \\
+        else vars(obj).values() if hasattr(obj, '__dict__') else ()
+    totals = [count_arrays(child, seen) for child in children]
+    return sum(t[0] for t in totals), sum(t[1] for t in totals)
+
+arrays, mapped = count_arrays(serving.model, set())
+print(json.dumps({'import': imported - start, 'load': loaded - imported, 'arrays': arrays, 'mapped': mapped}))
+"""
+
+def run_child(model_path, verify=True):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, model_path, 'verify' if verify else 'skip'],
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process'] = time.perf_counter() - start
+    return result
+
+def report(label, results):
+    def ms(key):
+        values = [result[key] * 1000 for result in results]
+        return f"{statistics.median(values):8.1f} ms (min {min(values):.1f})"
+    print(f"{label}:")
+    print(f"  imports:       {ms('import')}")
+    print(f"  model load:    {ms('load')}")
+    print(f"  process total: {ms('process')}")
+    print(f"  arrays:        {results[0]['arrays']} ({results[0]['mapped']} memory-mapped)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model startup for a pickle and an exported artifact")
+    parser.add_argument('--pickle', default=Config.MODEL_PATH, help="joblib pickle (default: MODEL_PATH)")
+    parser.add_argument('--artifact', required=True, help="artifact directory from export_model.py")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    cases = (('pickle', args.pickle, True),
+             ('artifact (mmap, checksum verified)', args.artifact, True),
+             ('artifact (mmap, MODEL_VERIFY_CHECKSUM=false)', args.artifact, False))
+    for label, path, verify in cases:
+        run_child(path, verify)  # warm the page cache so every case starts from the same state
+        report(label, [run_child(path, verify) for _ in range(args.runs)])
+
+if __name__ == "__main__":
+    main()
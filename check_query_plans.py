@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for the history and stats indexes
+
+Seeds car_predictions with synthetic rows inside a transaction, runs EXPLAIN
+on the history and stats query patterns and fails if any of them reads
+car_predictions with a sequential scan. The transaction is rolled back, so
+the table is left exactly as it was.
+
+Run after `alembic -c migrations/alembic.ini upgrade head`.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text, select, func, tuple_
+from app.models import CarPrediction
+from config import Config
+
+SEED_ROWS = int(os.getenv('PLAN_CHECK_ROWS', 200000))
+SEED_USERS = 500
+CHECK_USER_ID = 42
+
+SEED_SQL = """
+INSERT INTO car_predictions (
+    year, brand, model, color, engine_config, horsepower, torque, weight_kg,
+    zero_to_60_s, top_speed_mph, num_doors, transmission, drivetrain,
+    market_region, mileage, num_owners, interior_material, brake_type,
+    tire_brand, last_service_date, service_history, warranty_years,
+    damage_cost, damage_type, carbon_fiber_body, aero_package,
+    limited_edition, has_warranty, non_original_parts, damage,
+    predicted_price, created_at, user_id
+)
+SELECT
+    2000 + g % 25,
+    (ARRAY['Ferrari', 'Lamborghini', 'McLaren', 'Pagani', 'Bugatti', 'Koenigsegg', 'Aston Martin'])[1 + g % 7],
+    'Model ' || (g % 5000),
+    'red', 'V8', 500 + g % 1000, 400 + g % 600, 1400 + g % 400,
+    2.5 + (g % 20) / 10.0, 180 + g % 80, 2, 'Automatic', 'RWD',
+    'Europe', g % 50000, g % 4, 'Leather', 'Carbon Ceramic',
+    'Pirelli', '', 'Full', g % 5,
+    0.0, 'none', g % 2, g % 2,
+    0, 1, 0, 0,
+    200000 + (g % 3000) * 1000.0,
+    now() - (g || ' minutes')::interval,
+    1 + g % :users
+FROM generate_series(1, :rows) AS g
+"""
+
+def build_queries():
+    """The query shapes issued by /predictions/history and /predictions/stats"""
+    user_history = select(CarPrediction)\
+        .where(CarPrediction.user_id == CHECK_USER_ID)\
+        .order_by(CarPrediction.created_at.desc(), CarPrediction.id.desc())
+    cursor = (datetime.utcnow() - timedelta(days=30), 1000)
+
+    return [
+        ('history: first page for a user', user_history.limit(51)),
+        ('history: keyset page for a user',
+         user_history.where(tuple_(CarPrediction.created_at, CarPrediction.id) < tuple_(*cursor)).limit(51)),
+        ('history: all users, newest first',
+         select(CarPrediction).order_by(CarPrediction.created_at.desc(), CarPrediction.id.desc()).limit(51)),
+        ('history: brand substring filter',
+         select(CarPrediction).where(CarPrediction.brand.ilike('%koenig%'))
+         .order_by(CarPrediction.created_at.desc(), CarPrediction.id.desc()).limit(51)),
+        ('history: model substring count',
+         select(func.count(CarPrediction.id)).where(CarPrediction.model.ilike('%del 4242%'))),
+        ('stats: 24h partial-day count',
+         select(func.count(CarPrediction.id)).where(CarPrediction.created_at >= datetime.utcnow() - timedelta(hours=6))),
+        ('stats: brand breakdown for a user',
+         select(CarPrediction.brand, func.count(CarPrediction.id))
+         .where(CarPrediction.user_id == CHECK_USER_ID).group_by(CarPrediction.brand)),
+    ]
+
+def plan_nodes(plan):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect)
+    result = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    return result[0]['Plan']
+
+def check_query_plans():
+    """Seed, explain and report; returns True when no query seq-scans car_predictions"""
+    load_dotenv()
+    engine = create_engine(Config().DATABASE_URL)
+    if engine.dialect.name != 'postgresql':
+        print("Query plan checks require PostgreSQL")
+        return False
+
+    failures = 0
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            print(f"Seeding {SEED_ROWS} rows (rolled back afterwards)...")
+            conn.execute(text(SEED_SQL), {'rows': SEED_ROWS, 'users': SEED_USERS})
+            conn.execute(text("ANALYZE car_predictions"))
+
+            for name, statement in build_queries():
+                scans = [node for node in plan_nodes(explain(conn, statement))
+                         if node.get('Relation Name') == 'car_predictions']
+                seq_scan = any(node['Node Type'] == 'Seq Scan' for node in scans)
+                access = ', '.join(sorted({node.get('Index Name') or node['Node Type'] for node in scans}))
+                print(f"{'FAIL' if seq_scan else 'OK':4}  {name}: {access}")
+                failures += seq_scan
+        finally:
+            transaction.rollback()
+    engine.dispose()
+
+    return failures == 0
+
+if __name__ == "__main__":
+    if check_query_plans():
+        print("All history and stats queries use indexes")
+    else:
+        print("Some queries fall back to sequential scans!")
+        sys.exit(1)
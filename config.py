@@ -6,7 +6,34 @@ load_dotenv()
 class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request size
     JSON_SORT_KEYS = False
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'app.json_provider.FastJSONProvider')
+    PREDICT_INCLUDE_INPUT = os.getenv('PREDICT_INCLUDE_INPUT', 'true').lower() == 'true'
+    STATS_ETAG_TTL = int(os.getenv('STATS_ETAG_TTL', 60))
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
     MODEL_PATH = os.getenv('MODEL_PATH', 'supercar_price_prediction_model.pkl')
+    # MODEL_PATH may also name an artifact directory from export_model.py, whose
+    # arrays are memory-mapped (MODEL_MMAP_MODE, empty to copy) and shared between workers
+    MODEL_MMAP_MODE = os.getenv('MODEL_MMAP_MODE', 'r')
+    MODEL_VERIFY_CHECKSUM = os.getenv('MODEL_VERIFY_CHECKSUM', 'true').lower() == 'true'
+    # Replacement models are warmed with MODEL_WARMUP_ROUNDS synthetic batches before
+    # taking traffic; MODEL_WATCH_INTERVAL > 0 polls MODEL_PATH for a new file
+    MODEL_WARMUP_ROUNDS = int(os.getenv('MODEL_WARMUP_ROUNDS', 3))
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 0))
+    # Admin endpoints answer 403 until this is set
+    MODEL_ADMIN_TOKEN = os.getenv('MODEL_ADMIN_TOKEN', '')
+    # Load the model on a background thread so the app starts serving /health/live at
+    # once; serve.py still waits for it before forking
+    MODEL_LOAD_DEFERRED = os.getenv('MODEL_LOAD_DEFERRED', 'false').lower() == 'true'
+    USE_COMPILED_ENCODER = os.getenv('USE_COMPILED_ENCODER', 'true').lower() == 'true'
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 10000))
+    PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 3600))
+    MICROBATCH_ENABLED = os.getenv('MICROBATCH_ENABLED', 'false').lower() == 'true'
+    MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', 32))
+    MICROBATCH_MAX_LATENCY_MS = float(os.getenv('MICROBATCH_MAX_LATENCY_MS', 2))
+    MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 5000))
+    SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', 2500))
     DATABASE_URL = 'postgresql://{user}:{password}@{host}:{port}/{db}'.format(
         user=os.getenv('DB_USER', 'postgres'),
         password=os.getenv('DB_PASSWORD', 'password'),
@@ -15,4 +42,68 @@ class Config:
         db=os.getenv('DB_NAME', 'car_predictions')
     )
     SQLALCHEMY_DATABASE_URI = DATABASE_URL  
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_LEAK_THRESHOLD_SECONDS = float(os.getenv('DB_LEAK_THRESHOLD_SECONDS', 30))
+    # Tables are created by init_db.py and migrations; set for throwaway databases only
+    DB_CREATE_SCHEMA = os.getenv('DB_CREATE_SCHEMA', 'false').lower() == 'true'
+    
+    # Read-only endpoints use these replicas; clients that wrote within
+    # READ_YOUR_WRITES_SECONDS keep reading from the primary
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 5))
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 30))
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+    
+    # In-process cache of user fields for /auth/check and /auth/profile
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))
+    
+    # Password hashing runs on a bounded pool; 0 workers hashes on the request thread
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 1))
+    
+    # Per-endpoint rate limits as endpoint=requests/seconds; backend is 'local' or 'shared' (serve.py workers)
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMITS = os.getenv('RATE_LIMITS', 'auth.login=10/60,auth.register=5/300,'
+                            'predict.predict_car_price=120/60,predict.predict_car_prices_batch=20/60,'
+                            'predict.predict_price_sweep=30/60')
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'local')
+    RATE_LIMIT_SWEEP_INTERVAL = float(os.getenv('RATE_LIMIT_SWEEP_INTERVAL', 60))
+    RATE_LIMIT_SHARED_SLOTS = int(os.getenv('RATE_LIMIT_SHARED_SLOTS', 65536))
+    # Reverse proxies in front of the app; ProxyFix trusts this many X-Forwarded-For hops
+    PROXY_TRUSTED_HOPS = int(os.getenv('PROXY_TRUSTED_HOPS', 1))
+    
+    # X-Profile: 1 writes a cProfile dump per request to PROFILE_DIR; off unless enabled
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    
+    # Logging: LOG_ASYNC moves handlers onto a background thread; LOG_ROTATION is 'size', 'time' or 'none'
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_ASYNC = os.getenv('LOG_ASYNC', 'true').lower() == 'true'
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+    LOG_ROTATION = os.getenv('LOG_ROTATION', 'size')
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+    LOG_SUCCESS_SAMPLE_RATE = float(os.getenv('LOG_SUCCESS_SAMPLE_RATE', 1.0))
+    # > 0 thins success logs further under load, to about this many per second per process
+    LOG_SAMPLE_TARGET_PER_SECOND = float(os.getenv('LOG_SAMPLE_TARGET_PER_SECOND', 0))
+    
+    # Write-behind persistence of prediction records
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+    WRITE_BEHIND_QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', 10000))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 200))
+    WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL_MS', 500))
+    WRITE_BEHIND_ENQUEUE_TIMEOUT_MS = float(os.getenv('WRITE_BEHIND_ENQUEUE_TIMEOUT_MS', 50))
+    
+    # Pre-fork server (serve.py); keep workers * (pool + overflow) below Postgres max_connections
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', os.cpu_count() or 1))
+    WORKER_DB_POOL_SIZE = int(os.getenv('WORKER_DB_POOL_SIZE', 5))
+    WORKER_DB_MAX_OVERFLOW = int(os.getenv('WORKER_DB_MAX_OVERFLOW', 5))
     ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
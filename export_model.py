@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Export the trained model as a memory-mappable, versioned artifact
+
+Converts a joblib pickle (supercar_price_prediction_model.pkl) into an
+artifact directory holding an uncompressed pipeline.joblib, whose NumPy
+arrays the app memory-maps at startup, and a manifest.json with the version
+and checksums reported by /health. Point MODEL_PATH at the directory to use it.
+
+    python export_model.py supercar_price_prediction_model.pkl models/supercar --version 2025.08
+"""
+
+import argparse
+import os
+import sys
+import joblib
+from app.model_artifact import export_artifact, file_sha256, load_artifact
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a pickled model as an mmap-loadable artifact")
+    parser.add_argument('source', help="joblib pickle of the trained pipeline")
+    parser.add_argument('directory', help="artifact directory to create")
+    parser.add_argument('--version', help="version label (default: first 12 characters of the pickle's SHA-256)")
+    args = parser.parse_args()
+
+    if os.path.exists(os.path.join(args.directory, 'manifest.json')):
+        print(f"{args.directory} already holds an artifact; export to a new directory instead")
+        return 1
+
+    print(f"Loading {args.source}")
+    model = joblib.load(args.source)
+    version = args.version or file_sha256(args.source)[:12]
+    manifest = export_artifact(model, args.directory, version, source_path=args.source)
+
+    # Round-trip check: the mapped artifact must predict exactly like the pickle
+    from app.encoder import CompiledEncoder
+    from app.ml import FEATURE_DEFAULTS, FLOAT_COLUMNS, INT_COLUMNS, create_batch_dataframe
+    samples = CompiledEncoder(model, FEATURE_DEFAULTS, INT_COLUMNS, FLOAT_COLUMNS).sample_records()
+    frame = create_batch_dataframe(samples)
+    mapped, _ = load_artifact(args.directory)
+    if (mapped.predict(frame) != model.predict(frame)).any():
+        print("Exported artifact predicts differently from the source pickle")
+        return 1
+
+    pipeline = manifest['files']['pipeline.joblib']
+    print(f"Exported version {version} to {args.directory}")
+    print(f"  pipeline.joblib: {pipeline['bytes']} bytes, sha256 {pipeline['sha256']}")
+    print(f"Set MODEL_PATH={args.directory} to serve it")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,11 @@ Database initialization script for SuperCar Prediction application
 """
 
 import os
+import sys
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
-from app.models import Base, User, CarPrediction
+from app.database import create_schema
+from app.models import User, CarPrediction
 from config import Config
 
 def init_database():
@@ -34,19 +36,41 @@ def init_database():
             result = conn.execute(text("SELECT 1"))
             print("Database connection successful!")
         
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables (the app itself no longer does this at startup)
+        create_schema(engine)
         print("Database tables created successfully!")
         
         # Create a default admin user
         create_default_user(engine)
         
+        # Catch-up job for the stats rollups (python init_db.py --rebuild-rollups)
+        if '--rebuild-rollups' in sys.argv:
+            rebuild_prediction_rollups(engine)
+        
         return True
         
     except Exception as e:
         print(f"Database initialization failed: {str(e)}")
         return False
 
+def rebuild_prediction_rollups(engine):
+    """Recompute the stats rollup tables from car_predictions"""
+    from sqlalchemy.orm import sessionmaker
+    from app.rollups import rebuild_rollups
+    
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = SessionLocal()
+    
+    try:
+        rebuild_rollups(session)
+        session.commit()
+        print("Prediction rollups rebuilt")
+    except Exception as e:
+        session.rollback()
+        print(f"Error rebuilding prediction rollups: {str(e)}")
+    finally:
+        session.close()
+
 def create_default_user(engine):
     """Create a default admin user for testing"""
     from sqlalchemy.orm import sessionmaker
@@ -90,6 +114,7 @@ if __name__ == "__main__":
         print("\nTables created:")
         print("- users (for authentication)")
         print("- car_predictions (with user_id foreign key)")
+        print("- prediction_brand_rollups / prediction_daily_rollups (stats aggregates)")
         print("\nYou can now:")
         print("1. Register new users")
         print("2. Login with existing users")
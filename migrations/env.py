@@ -1,10 +1,12 @@
 import logging
 from logging.config import fileConfig
 
-from flask import current_app
+from flask import current_app, has_app_context
+from sqlalchemy import create_engine
 
 from alembic import context
 from app.models import Base  # import your declarative base
+from config import Config
 
 target_metadata = Base.metadata
 
@@ -20,6 +22,9 @@ logger = logging.getLogger('alembic.env')
 
 
 def get_engine():
+    if not has_app_context():
+        # plain `alembic -c migrations/alembic.ini ...` without a Flask app
+        return create_engine(Config.DATABASE_URL)
     try:
         # this works with Flask-SQLAlchemy<3 and Alchemical
         return current_app.extensions['migrate'].db.get_engine()
@@ -41,7 +46,7 @@ def get_engine_url():
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 config.set_main_option('sqlalchemy.url', get_engine_url())
-target_db = current_app.extensions['migrate'].db
+target_db = current_app.extensions['migrate'].db if has_app_context() else None
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -50,6 +55,8 @@ target_db = current_app.extensions['migrate'].db
 
 
 def get_metadata():
+    if target_db is None:
+        return target_metadata
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
     return target_db.metadata
@@ -94,7 +101,7 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
-    conf_args = current_app.extensions['migrate'].configure_args
+    conf_args = current_app.extensions['migrate'].configure_args if has_app_context() else {}
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
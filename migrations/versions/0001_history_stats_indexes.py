@@ -0,0 +1,61 @@
+"""Add indexes for the history and stats query patterns
+
+Revision ID: 0001_history_stats_indexes
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_history_stats_indexes'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BTREE_INDEXES = [
+    # History: WHERE user_id = ? ORDER BY created_at DESC, id DESC (keyset seek)
+    ('ix_car_predictions_user_created', ['user_id', sa.text('created_at DESC'), sa.text('id DESC')]),
+    # History without a user scope, and the 24h window in stats
+    ('ix_car_predictions_created', [sa.text('created_at DESC'), sa.text('id DESC')]),
+    # Stats: WHERE user_id = ? GROUP BY brand (rollup rebuilds)
+    ('ix_car_predictions_user_brand', ['user_id', 'brand']),
+]
+
+TRIGRAM_INDEXES = [
+    ('ix_car_predictions_brand_trgm', 'brand'),
+    ('ix_car_predictions_model_trgm', 'model'),
+]
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, columns in BTREE_INDEXES:
+            op.create_index(name, 'car_predictions', columns, if_not_exists=True,
+                            postgresql_concurrently=is_postgres)
+
+        if is_postgres:
+            # Trigram GIN indexes let ILIKE '%...%' filters use an index scan
+            op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for name, column in TRIGRAM_INDEXES:
+                op.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                    f'ON car_predictions USING gin ({column} gin_trgm_ops)'
+                )
+
+
+def downgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        if is_postgres:
+            for name, _ in TRIGRAM_INDEXES:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+        for name, _ in reversed(BTREE_INDEXES):
+            op.drop_index(name, table_name='car_predictions', if_exists=True,
+                          postgresql_concurrently=is_postgres)
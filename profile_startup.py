@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup profile for the SuperCar Prediction application
+
+Starts the app in a fresh interpreter with `python -X importtime` and
+reports where worker startup time goes:
+
+- the create_app phases (database, model, ...) from app.extensions['startup_ms']
+- when /health/live first answers and when the model is ready to serve
+- the packages that cost the most import time
+
+    python profile_startup.py --top 15
+    python profile_startup.py --deferred   # with MODEL_LOAD_DEFERRED=true
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+CHILD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from app import create_app, ml
+app = create_app()
+created = time.perf_counter()
+live_status = app.test_client().get('/health/live').status_code
+live = time.perf_counter()
+ml.registry.wait(timeout=120)
+ready = time.perf_counter()
+print(json.dumps({
+    'phases_ms': app.extensions['startup_ms'],
+    'create_app_ms': (created - start) * 1000,
+    'live_ms': (live - start) * 1000,
+    'live_status': live_status,
+    'model_ready_ms': (ready - start) * 1000 if ml.registry.current is not None else None
+}))
+ml.stop_model_watcher()
+ml.stop_micro_batcher()
+"""
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def parse_importtime(stderr):
+    """Return (self_us, cumulative_us, depth, module) tuples from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((int(self_us), int(cumulative_us), len(indent), module))
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile application startup and import time")
+    parser.add_argument('--top', type=int, default=15, help="packages to list")
+    parser.add_argument('--deferred', action='store_true', help="profile with MODEL_LOAD_DEFERRED=true")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.deferred:
+        env['MODEL_LOAD_DEFERRED'] = 'true'
+    child = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+                           capture_output=True, text=True, env=env)
+    result_lines = [line for line in child.stdout.splitlines() if line.startswith('{')]
+    if child.returncode != 0 or not result_lines:
+        print(child.stderr[-2000:])
+        return 1
+    result = json.loads(result_lines[-1])
+    entries = parse_importtime(child.stderr)
+
+    print("create_app phases:")
+    for name, duration in result['phases_ms'].items():
+        print(f"  {name:<18} {duration:9.1f} ms")
+    print(f"\n/health/live answered ({result['live_status']}) after {result['live_ms']:9.1f} ms")
+    if result['model_ready_ms'] is not None:
+        print(f"model ready after              {result['model_ready_ms']:9.1f} ms")
+    else:
+        print("model failed to load")
+
+    # Self time summed per top-level package, so nothing is counted twice
+    by_package = defaultdict(int)
+    for self_us, _, _, module in entries:
+        by_package[module.split('.')[0]] += self_us
+    total_us = sum(by_package.values())
+    print(f"\nimport time by package (total {total_us / 1000:.1f} ms):")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {package:<24} {self_us / 1000:9.1f} ms  {self_us / total_us:6.1%}")
+
+    # Direct imports of app modules, with everything they pulled in
+    app_imports = [(cumulative_us, module) for _, cumulative_us, _, module in entries
+                   if module.startswith('app.')]
+    print("\nslowest app modules (cumulative):")
+    for cumulative_us, module in sorted(app_imports, reverse=True)[:args.top]:
+        print(f"  {module:<32} {cumulative_us / 1000:9.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
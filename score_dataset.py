@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring for SuperCar Prediction datasets
+
+Re-prices a CSV or Parquet file shaped like supercars_train.csv without going
+through HTTP. The input is read in fixed-size chunks, scored in a process pool
+whose workers each load the model once, and appended to a CSV output in input
+order with a `predicted_price` column. Only a bounded number of chunks is in
+flight, so memory use does not grow with the input.
+
+After every written chunk a checkpoint records how far the output got; rerun
+with --resume to continue an interrupted run.
+
+    python score_dataset.py supercars_train.csv repriced.csv --chunk-size 50000 --workers 4
+    python score_dataset.py supercars_train.parquet repriced.csv --resume
+
+Parquet input needs the optional `pyarrow` package.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from config import Config
+
+PREDICTION_COLUMN = 'predicted_price'
+
+def init_worker(model_path, use_compiled_encoder):
+    """Process pool initializer: load the model once per worker"""
+    from app import ml
+    ml.registry.publish(ml.load_model(model_path, use_compiled_encoder))
+
+def score_chunk(chunk):
+    """Score one DataFrame chunk with app.ml, returning a float64 array of prices"""
+    from app import ml
+    features = chunk.reindex(columns=ml.FEATURE_COLUMNS)
+    # Missing cells must reach the model as None so FEATURE_DEFAULTS apply, as for API requests
+    records = features.astype(object).where(features.notna(), None).to_dict('records')
+    return np.asarray(ml.score_records(records), dtype='float64')
+
+def iter_chunks(path, chunk_size, skip_rows=0):
+    """Yield DataFrame chunks of chunk_size rows, starting skip_rows into the file"""
+    import pandas as pd
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size,
+                               skiprows=range(1, skip_rows + 1) if skip_rows else None)
+
+def load_checkpoint(path, input_path, chunk_size):
+    """Return the saved checkpoint for this input, or None to start from scratch"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint['input'] != os.path.abspath(input_path) or checkpoint['chunk_size'] != chunk_size:
+        raise SystemExit(f"Checkpoint {path} was written for a different input or chunk size")
+    return checkpoint
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so a crash never leaves it half-written"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def score_dataset(input_path, output_path, chunk_size, workers, checkpoint_path,
+                  resume=False, model_path=None, use_compiled_encoder=True):
+    """Score input_path into output_path; returns the number of rows written"""
+    model_path = model_path or Config.MODEL_PATH
+    checkpoint = load_checkpoint(checkpoint_path, input_path, chunk_size) if resume else None
+    if checkpoint is None:
+        checkpoint = {'input': os.path.abspath(input_path), 'chunk_size': chunk_size,
+                      'chunks': 0, 'rows': 0, 'output_bytes': 0}
+    else:
+        print(f"Resuming after {checkpoint['rows']} rows ({checkpoint['chunks']} chunks)")
+
+    if workers > 0:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                   initargs=(model_path, use_compiled_encoder))
+    else:
+        init_worker(model_path, use_compiled_encoder)
+        pool = None
+
+    # Chunks waiting on a worker; bounded so reading never runs ahead of scoring
+    max_in_flight = max(workers, 1) * 2
+    pending = deque()
+    start = time.perf_counter()
+    rows_at_start = checkpoint['rows']
+
+    # Drop anything written after the last checkpoint, e.g. a half-written chunk
+    with open(output_path, 'r+b' if checkpoint['chunks'] else 'wb') as out:
+        out.truncate(checkpoint['output_bytes'])
+    out = open(output_path, 'a', newline='')
+
+    def write_next():
+        chunk, result = pending.popleft()
+        prices = result.result() if pool is not None else result
+        chunk[PREDICTION_COLUMN] = prices
+        chunk.to_csv(out, header=checkpoint['chunks'] == 0, index=False)
+        out.flush()
+        os.fsync(out.fileno())
+
+        checkpoint['chunks'] += 1
+        checkpoint['rows'] += len(chunk)
+        checkpoint['output_bytes'] = out.tell()
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.perf_counter() - start
+        rate = (checkpoint['rows'] - rows_at_start) / elapsed if elapsed else 0.0
+        print(f"Scored {checkpoint['rows']} rows ({rate:,.0f} rows/s)")
+
+    try:
+        for chunk in iter_chunks(input_path, chunk_size, checkpoint['rows']):
+            result = pool.submit(score_chunk, chunk) if pool is not None else score_chunk(chunk)
+            pending.append((chunk, result))
+            if len(pending) >= max_in_flight:
+                write_next()
+        while pending:
+            write_next()
+    finally:
+        out.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    os.remove(checkpoint_path)
+    return checkpoint['rows']
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet dataset with the trained model")
+    parser.add_argument('input', help="CSV or .parquet file with the training data columns")
+    parser.add_argument('output', help="CSV file to write (input columns plus predicted_price)")
+    parser.add_argument('--chunk-size', type=int, default=20000, help="rows per chunk")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="scoring processes; 0 scores in this process")
+    parser.add_argument('--checkpoint', help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument('--resume', action='store_true', help="continue from the checkpoint")
+    parser.add_argument('--model', help="model artifact (default: MODEL_PATH)")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    start = time.perf_counter()
+    rows = score_dataset(
+        args.input, args.output, args.chunk_size, max(args.workers, 0),
+        args.checkpoint or f"{args.output}.checkpoint", resume=args.resume,
+        model_path=args.model, use_compiled_encoder=Config.USE_COMPILED_ENCODER
+    )
+    print(f"Wrote {rows} rows to {args.output} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("Interrupted; rerun with --resume to continue")
+        sys.exit(1)
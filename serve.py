@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Pre-fork production server for SuperCar Prediction application
+
+The model is loaded once in the parent process, which then forks
+SERVER_WORKERS workers sharing its memory pages copy-on-write. Each worker
+gets its own SQLAlchemy engine sized by WORKER_DB_POOL_SIZE and
+WORKER_DB_MAX_OVERFLOW, and accepts connections from a shared listening socket.
+"""
+
+import gc
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from werkzeug.serving import make_server
+from app import create_app
+from app import database, hashing, logs, ml, write_behind
+
+def bind_socket(host, port, backlog=128):
+    """Create the listening socket shared by every worker"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock, log_queue):
+    """Serve requests in a forked worker process"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, lambda signum, frame: sys.exit(0))
+
+    # Log records go to the parent, the only process writing the log file
+    logs.configure_logging(app, log_queue)
+
+    # Pools and threads from the parent are not usable after fork
+    database.reinit_db_after_fork(
+        app,
+        app.config['WORKER_DB_POOL_SIZE'],
+        app.config['WORKER_DB_MAX_OVERFLOW']
+    )
+    ml.start_micro_batcher(app)
+    ml.start_model_watcher(app)
+    write_behind.init_write_behind(app)
+    hashing.init_password_hashing(app)
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    app.logger.info(f"Worker {os.getpid()} serving on {host}:{port}")
+    server.serve_forever()
+
+def spawn_worker(app, sock, log_queue):
+    """Fork a worker process and return its pid"""
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            run_worker(app, sock, log_queue)
+        except SystemExit:
+            pass
+        except Exception as e:
+            app.logger.error(f"Worker {os.getpid()} crashed: {str(e)}")
+            exit_code = 1
+        finally:
+            # os._exit skips atexit, so flush queued predictions explicitly
+            write_behind.shutdown_write_behind()
+            ml.stop_micro_batcher()
+            ml.stop_model_watcher()
+            logs.stop_logging()
+            os._exit(exit_code)
+    return pid
+
+def serve():
+    """Load the app once, fork the workers and supervise them"""
+    if not hasattr(os, 'fork'):
+        print("Pre-fork serving requires a POSIX platform; use run.py instead")
+        return False
+
+    app = create_app()
+    # Workers share the parent's model copy-on-write, so finish a deferred load before forking
+    ml.registry.wait()
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', 5000))
+    workers = max(1, app.config['SERVER_WORKERS'])
+
+    max_connections = workers * (app.config['WORKER_DB_POOL_SIZE'] + app.config['WORKER_DB_MAX_OVERFLOW'])
+    app.logger.info(f"Starting {workers} workers on {host}:{port} (up to {max_connections} database connections)")
+
+    sock = bind_socket(host, port)
+    log_queue = multiprocessing.Queue()
+    logs.start_process_listener(app, log_queue)
+
+    # Release parent-only resources, then move every live object into the
+    # permanent generation so GC in the workers doesn't dirty shared pages
+    if database.engine is not None:
+        database.engine.dispose()
+    if database.ReadSessionLocal is not None:
+        database.ReadSessionLocal.dispose()
+    ml.stop_micro_batcher()
+    ml.stop_model_watcher()
+    write_behind.shutdown_write_behind()
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+    stopping = False
+
+    def handle_shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+
+    for _ in range(workers):
+        children.add(spawn_worker(app, sock, log_queue))
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        children.discard(pid)
+        if not stopping:
+            app.logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            time.sleep(1)
+            children.add(spawn_worker(app, sock, log_queue))
+
+    sock.close()
+    app.logger.info("All workers stopped")
+    logs.stop_logging()
+    return True
+
+if __name__ == '__main__':
+    if not serve():
+        sys.exit(1)
@@ -0,0 +1,132 @@
+"""CompiledEncoder must reproduce the fitted pipeline's own preprocessing"""
+
+import math
+import os
+
+import numpy as np
+import pytest
+
+from app.encoder import CompiledEncoder
+from app.ml import FEATURE_DEFAULTS, INT_COLUMNS, FLOAT_COLUMNS, create_batch_dataframe
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'supercar_price_prediction_model.pkl')
+
+BASE = {'year': 2020, 'brand': 'Ferrari', 'model': 'F8 Tributo', 'horsepower': 710}
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    joblib = pytest.importorskip('joblib')
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip(f"{MODEL_PATH} not found")
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def encoder(pipeline):
+    return CompiledEncoder(pipeline, FEATURE_DEFAULTS, INT_COLUMNS, FLOAT_COLUMNS)
+
+
+def reference(pipeline, records):
+    """What the sklearn path feeds the estimator for the same records"""
+    expected = pipeline[:-1].transform(create_batch_dataframe(records))
+    return expected.toarray() if hasattr(expected, 'toarray') else np.asarray(expected)
+
+
+def assert_equivalent(pipeline, encoder, records):
+    np.testing.assert_allclose(encoder.encode_batch(records), reference(pipeline, records),
+                               rtol=1e-9, atol=1e-12)
+    # Row by row as well: pandas infers column dtypes per batch
+    for record in records:
+        np.testing.assert_allclose(encoder.encode(record), reference(pipeline, [record]),
+                                   rtol=1e-9, atol=1e-12)
+
+
+def test_known_categories(pipeline, encoder):
+    assert_equivalent(pipeline, encoder, encoder.sample_records(count=16))
+
+
+def test_empty_record_uses_defaults(pipeline, encoder):
+    assert_equivalent(pipeline, encoder, [{}])
+
+
+@pytest.mark.parametrize('column, value', [
+    ('brand', 'Trabant'),
+    ('color', 'plaid'),
+    ('damage_type', ''),
+    ('model', 42),
+    ('transmission', 'missing'),
+])
+def test_unknown_categories(pipeline, encoder, column, value):
+    assert_equivalent(pipeline, encoder, [dict(BASE, **{column: value})])
+
+
+@pytest.mark.parametrize('column', ['horsepower', 'zero_to_60_s', 'damage_cost', 'brand', 'color'])
+@pytest.mark.parametrize('value', [None, float('nan')])
+def test_missing_values(pipeline, encoder, column, value):
+    assert_equivalent(pipeline, encoder, [dict(BASE, **{column: value})])
+
+
+@pytest.mark.parametrize('column, value', [
+    ('carbon_fiber_body', True),
+    ('has_warranty', False),
+    ('horsepower', True),
+    ('damage_cost', False),
+    ('brand', True),
+])
+def test_bool_values(pipeline, encoder, column, value):
+    assert_equivalent(pipeline, encoder, [dict(BASE, **{column: value})])
+
+
+@pytest.mark.parametrize('column, value', [
+    ('horsepower', '650'),
+    ('zero_to_60_s', '2.9'),
+    ('mileage', '1e3'),
+    ('torque', ' 770 '),
+    ('weight_kg', 'abc'),
+    ('damage_cost', ''),
+    ('num_owners', '1_000'),
+    ('year', '2019.9'),
+])
+def test_numeric_strings(pipeline, encoder, column, value):
+    assert_equivalent(pipeline, encoder, [dict(BASE, **{column: value})])
+
+
+@pytest.mark.parametrize('column, value', [
+    ('year', 2019.9),
+    ('mileage', -3.7),
+    ('horsepower', 650.99),
+    ('num_doors', 2.5),
+    ('warranty_years', -0.5),
+])
+def test_int_columns_truncate(pipeline, encoder, column, value):
+    record = dict(BASE, **{column: value})
+    assert_equivalent(pipeline, encoder, [record])
+    block, j = encoder._numeric_column(column)
+    raw = encoder.encode(record)[0, block.offset + j] * block.scale[j] + block.mean[j]
+    assert raw == pytest.approx(math.trunc(value))
+
+
+def test_mixed_batch(pipeline, encoder):
+    records = [
+        BASE,
+        dict(BASE, brand='Trabant', horsepower='650', mileage=None),
+        dict(BASE, color=float('nan'), zero_to_60_s='2.9', carbon_fiber_body=True),
+        dict(BASE, year=2019.9, damage_cost='abc'),
+        {},
+    ]
+    assert_equivalent(pipeline, encoder, records)
+
+
+def test_non_finite_int_rejected(encoder):
+    with pytest.raises(ValueError):
+        encoder.encode(dict(BASE, mileage=float('inf')))
+
+
+def test_grid_matches_expanded_records(pipeline, encoder):
+    mileages = [0, 1500.5, 30000]
+    owners = [1, 3]
+    grid = encoder.encode_grid(BASE, [('mileage', mileages), ('num_owners', owners)])
+    records = [dict(BASE, mileage=m, num_owners=o) for m in mileages for o in owners]
+    np.testing.assert_allclose(grid, reference(pipeline, records), rtol=1e-9, atol=1e-12)